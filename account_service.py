@@ -0,0 +1,284 @@
+# Description: Account business logic without any GUI dependency.
+# AccountService validates input, hashes PINs and reads or writes the accounts table. The Tkinter
+# windows in main_app.py are thin callers of this module, and batch jobs or servers can use it
+# directly without importing tkinter.
+
+import hashlib
+import hmac
+import secrets
+import sqlite3
+
+import config
+import queries
+from queries import ACCOUNT_FIELDS
+from bloom import UsernameFilter
+from cache import TTLCache
+from database import connect_db
+from hashing import hash_pin, needs_rehash, verify_pin, verify_unknown_user
+from migrations import ACCOUNT_COLUMNS
+from sessions import SessionStore
+from throttle import LOCAL_SOURCE, default_limiter
+from writebehind import WriteBehindQueue
+
+# Predefined security questions for account creation
+SECURITY_QUESTIONS = [
+    "-- Select --", "What is your mother's maiden name?", "What city were you born in?",
+    "What is the name of your first pet?", "What is your favorite color?",
+    "What is the name of your elementary school?"
+]
+
+# Predefined account types for account creation
+ACCOUNT_TYPES = ["-- Select --", "User", "Vendor"]
+
+# Fields supplied when creating an account, in the order create_account() takes them
+NEW_ACCOUNT_FIELDS = ACCOUNT_COLUMNS
+
+
+class AccountError(Exception):
+    """Base class for errors that should be shown to the user as-is."""
+
+
+class ValidationError(AccountError):
+    """Raised when account input is incomplete or malformed."""
+
+
+class UsernameTakenError(AccountError):
+    """Raised when creating an account whose username already exists."""
+
+    def __init__(self, username):
+        super().__init__("Username already exists. Please choose another one.")
+        self.username = username
+
+
+class ThrottledError(AccountError):
+    """Raised when too many attempts were made for a username or from a source."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Too many attempts. Please try again in {max(1, round(retry_after))} seconds.")
+        self.retry_after = retry_after
+
+
+# Per-field message for an empty required field
+MISSING_FIELD = "Required."
+
+
+def is_valid_pin(pin):
+    """Return True if the PIN is a 4-digit number."""
+    return pin.isdigit() and len(pin) == 4
+
+
+def account_field_errors(first_name, last_name, address_line1, address_line2, account_type, username, pin,
+                         security_question, security_answer, confirm_pin=None):
+    """Return a {field name: message} dict of every problem with the fields of a new account."""
+    confirm_pin = pin if confirm_pin is None else confirm_pin
+    errors = {}
+    required = {"first_name": first_name, "last_name": last_name, "address_line1": address_line1,
+                "username": username, "pin": pin, "confirm_pin": confirm_pin, "security_answer": security_answer}
+    for name, value in required.items():
+        if not value:
+            errors[name] = MISSING_FIELD
+    if pin and not is_valid_pin(pin):
+        errors["pin"] = "PIN must be a 4-digit number."
+    if confirm_pin and pin != confirm_pin:
+        errors["confirm_pin"] = "PINs do not match."
+    if account_type not in ACCOUNT_TYPES[1:]:
+        errors["account_type"] = "Please select an account type."
+    if security_question not in SECURITY_QUESTIONS[1:]:
+        errors["security_question"] = "Please select a security question."
+    return errors
+
+
+def validate_new_account(first_name, last_name, address_line1, address_line2, account_type, username, pin,
+                         security_question, security_answer, confirm_pin=None):
+    """Raise ValidationError with the first problem account_field_errors finds in a new account."""
+    errors = account_field_errors(first_name, last_name, address_line1, address_line2, account_type, username, pin,
+                                  security_question, security_answer, confirm_pin)
+    if MISSING_FIELD in errors.values():
+        raise ValidationError("Please fill in all fields.")
+    if errors:
+        raise ValidationError(next(iter(errors.values())))
+
+
+def validate_new_pin(new_pin, confirm_pin=None):
+    """Raise ValidationError if a replacement PIN is not acceptable."""
+    confirm_pin = new_pin if confirm_pin is None else confirm_pin
+    if not (new_pin and confirm_pin):
+        raise ValidationError("Please enter both new PIN and confirm PIN.")
+    if new_pin != confirm_pin:
+        raise ValidationError("PINs do not match.")
+    if not is_valid_pin(new_pin):
+        raise ValidationError("PIN must be a 4-digit number.")
+
+
+class AccountService:
+    """Create, authenticate and recover accounts stored in the SQLite database."""
+
+    def __init__(self, connect=connect_db, sessions=None, username_filter=None, limiter=None, recovery_cache=None,
+                 write_queue=None):
+        self.connect = connect
+        self.sessions = sessions or SessionStore()
+        self.username_filter = username_filter or UsernameFilter(connect=connect)
+        self.limiter = limiter or default_limiter()
+        # username -> (security question, answer digest); the answer itself is never kept in memory
+        self.recovery_cache = recovery_cache or TTLCache(config.RECOVERY_CACHE_SIZE, config.RECOVERY_CACHE_TTL)
+        self._answer_key = secrets.token_bytes(32)
+        # Signups and PIN resets are batched through this queue when it is set
+        self.write_queue = write_queue or (WriteBehindQueue(connect) if config.WRITE_BEHIND else None)
+
+    def _write(self, name, parameters):
+        """Run a registered write query, through the write-behind queue if there is one; return its rowcount."""
+        if self.write_queue is not None:
+            return self.write_queue.execute(name, parameters)
+        with self.connect() as conn:
+            return queries.execute(conn, name, parameters).rowcount
+
+    def close(self, timeout=None):
+        """Commit queued writes and save the in-memory state that outlives the process.
+
+        Return False if the queued writes were not committed within timeout seconds.
+        """
+        flushed = self.write_queue.close(timeout) if self.write_queue is not None else True
+        self.username_filter.save()
+        self.limiter.stop_persistence()
+        return flushed
+
+    def _throttle(self, action, username, source):
+        """Count an attempt against the username and the source; raise ThrottledError if either is over limit.
+
+        Local attempts share one source, so they are only limited per username.
+        """
+        scopes = {"user": username} if source == LOCAL_SOURCE else {"user": username, "source": source}
+        retry_after = self.limiter.check(action, **scopes)
+        if retry_after:
+            raise ThrottledError(retry_after)
+
+    def _succeeded(self, action, username, source):
+        """Clear the username's failures and give the source back the token of a successful attempt."""
+        self.limiter.forgive(action, "user", username)
+        if source != LOCAL_SOURCE:
+            self.limiter.refund(action, "source", source)
+
+    def create_account(self, first_name, last_name, address_line1, address_line2, account_type, username, pin,
+                       security_question, security_answer, confirm_pin=None):
+        """Validate and insert a new account. Raise UsernameTakenError if the username exists."""
+        validate_new_account(first_name, last_name, address_line1, address_line2, account_type, username, pin,
+                             security_question, security_answer, confirm_pin)
+        # A single atomic insert: the UNIQUE index on username rejects duplicates
+        pin_hash = hash_pin(pin)
+        try:
+            self._write("insert_account", (first_name, last_name, address_line1, address_line2, account_type,
+                                           username, pin_hash, security_question, security_answer))
+        except sqlite3.IntegrityError:
+            self.username_filter.add(username)
+            raise UsernameTakenError(username) from None
+        self.username_filter.add(username)
+        self.recovery_cache.pop(username)
+
+    def username_available(self, username):
+        """Return True if no account uses the username.
+
+        The Bloom filter answers most checks from memory; only probable hits query the database.
+        """
+        if not self.username_filter.might_contain(username):
+            return True
+        with self.connect() as conn:
+            return queries.execute(conn, "username_exists", (username,)).fetchone() is None
+
+    def authenticate(self, username, pin, source=LOCAL_SOURCE):
+        """Return the account matching the username and PIN as a dict, or None.
+
+        source identifies the client (an IP address, or LOCAL_SOURCE for the GUI) for throttling;
+        over-limit attempts raise ThrottledError before any hashing or SQL. A stored hash that is
+        legacy SHA-256 or weaker than the current work factor is replaced with a fresh hash after a
+        successful login.
+        """
+        if not (username and pin):
+            raise ValidationError("Please enter both username and PIN.")
+        self._throttle("login", username, source)
+        with self.connect() as conn:
+            row = queries.execute(conn, "authenticate", (username,)).fetchone()
+        if row is None:
+            verify_unknown_user(pin)
+            return None
+        account_id, stored_hash = row
+        if not verify_pin(pin, stored_hash):
+            return None
+        self._succeeded("login", username, source)
+        if needs_rehash(stored_hash):
+            self.upgrade_pin_hash(username, stored_hash, pin)
+        # Only a successful login reads the table row
+        with self.connect() as conn:
+            account = queries.execute(conn, "account_by_id", (account_id,)).fetchone()
+        return dict(zip(ACCOUNT_FIELDS, account)) if account else None
+
+    def login(self, username, pin, source=LOCAL_SOURCE):
+        """Authenticate and open a session. Return (token, SessionAccount), or None on bad credentials."""
+        account = self.authenticate(username, pin, source)
+        if account is None:
+            return None
+        token = self.sessions.issue(account)
+        return token, self.sessions.get(token)
+
+    def get_session(self, token):
+        """Return the SessionAccount of a live session without touching the database, or None."""
+        return self.sessions.get(token)
+
+    def logout(self, token):
+        """End a session."""
+        return self.sessions.invalidate(token)
+
+    def _answer_digest(self, answer):
+        """Return a keyed digest of a security answer, so cached answers are not stored in the clear."""
+        return hmac.new(self._answer_key, answer.encode(), hashlib.sha256).digest()
+
+    def _recovery_info(self, username):
+        """Return (security question, answer digest) of an account, or None; read through the cache.
+
+        The digest is None when the account has no stored answer, and such an account never verifies.
+        """
+        info = self.recovery_cache.get(username)
+        if info is None:
+            with self.connect() as conn:
+                row = queries.execute(conn, "get_recovery", (username,)).fetchone()
+            if row is None:
+                return None
+            info = (row[0], self._answer_digest(row[1]) if row[1] else None)
+            self.recovery_cache.set(username, info)
+        return info
+
+    def upgrade_pin_hash(self, username, old_hash, pin):
+        """Replace a stored hash with a current one, unless the PIN changed in the meantime."""
+        new_hash = hash_pin(pin)
+        with self.connect() as conn:
+            queries.execute(conn, "upgrade_pin", (new_hash, username, old_hash))
+
+    def get_security_question(self, username):
+        """Return the security question of an account, or None if the username is unknown."""
+        if not username:
+            raise ValidationError("Please enter your username.")
+        info = self._recovery_info(username)
+        return info[0] if info else None
+
+    def verify_security_answer(self, username, answer, source=LOCAL_SOURCE):
+        """Return True if the answer matches the stored security answer.
+
+        Attempts are throttled like logins, in separate buckets. The question lookup that precedes
+        an answer leaves the account in the recovery cache, so checking the answer reads no rows.
+        """
+        self._throttle("answer", username, source)
+        info = self._recovery_info(username)
+        correct = (bool(answer) and info is not None and info[1] is not None
+                   and hmac.compare_digest(self._answer_digest(answer), info[1]))
+        if correct:
+            self._succeeded("answer", username, source)
+        return correct
+
+    def reset_pin(self, username, new_pin, confirm_pin=None):
+        """Validate and store a new PIN. Return False if the username is unknown."""
+        validate_new_pin(new_pin, confirm_pin)
+        updated = self._write("update_pin", (hash_pin(new_pin), username))
+        # Sessions opened with the old PIN must not outlive it
+        self.sessions.invalidate_user(username)
+        # The recovery flow is over; do not keep its cached question and answer around
+        self.recovery_cache.pop(username)
+        return updated > 0
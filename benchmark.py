@@ -0,0 +1,236 @@
+# Description: Benchmark suite for the login, signup, forgot-PIN and PIN reset paths.
+# Generates synthetic accounts into a temporary database, then drives the same AccountService
+# methods the windows and the HTTP server call (and therefore the same SQL and hash_pin work),
+# and prints throughput plus p50/p95/p99 latency as JSON so runs can be compared over time.
+#
+# Usage: python benchmark.py [--rows N] [--iterations N] [--threads N] [--scenarios a,b] [--output FILE]
+#
+# The lookup_covering and lookup_full_row scenarios isolate the login query, for example:
+#   python benchmark.py --rows 1000000 --iterations 100000 --scenarios lookup_full_row,lookup_covering
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+import config
+import database
+import queries
+from account_service import ACCOUNT_TYPES, SECURITY_QUESTIONS, AccountService
+from bloom import UsernameFilter
+import hashing
+from throttle import RateLimiter
+from writebehind import WriteBehindQueue
+
+# Rows inserted per transaction while generating synthetic accounts
+GENERATE_BATCH_SIZE = 50000
+
+# Distinct PINs used by the synthetic accounts. Each one is hashed once with the salted KDF and
+# its hash is shared by every row using it, which keeps generating millions of rows fast.
+SYNTHETIC_PINS = 100
+
+
+def synthetic_username(index):
+    """Return the username of the synthetic account with the given index."""
+    return f"user{index:08d}"
+
+
+def synthetic_pin(index):
+    """Return the PIN of the synthetic account with the given index."""
+    return f"{index % SYNTHETIC_PINS:04d}"
+
+
+def generate_accounts(path, rows, start=0):
+    """Insert synthetic accounts into the database at path."""
+    pins = [synthetic_pin(index) for index in range(SYNTHETIC_PINS)]
+    pin_hashes = dict(zip(pins, hashing.hash_pins(pins)))
+    conn = sqlite3.connect(path)
+    try:
+        for batch_start in range(start, start + rows, GENERATE_BATCH_SIZE):
+            batch = []
+            for index in range(batch_start, min(batch_start + GENERATE_BATCH_SIZE, start + rows)):
+                pin = synthetic_pin(index)
+                batch.append((f"First{index}", f"Last{index}", f"{index} Main St", "",
+                              ACCOUNT_TYPES[1 + index % 2], synthetic_username(index), pin_hashes[pin],
+                              SECURITY_QUESTIONS[1 + index % 5], f"answer{index}"))
+            queries.executemany(conn, "insert_account", batch)
+            conn.commit()
+    finally:
+        conn.close()
+
+
+def percentile(sorted_values, fraction):
+    """Return the nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def run_scenario(operation, iterations, threads):
+    """Call operation(i) for i in range(iterations) across threads and summarize the latencies."""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def worker(offset):
+        local = []
+        for i in range(offset, iterations, threads):
+            started = time.perf_counter()
+            try:
+                operation(i)
+            except Exception:
+                with lock:
+                    errors[0] += 1
+            local.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=worker, args=(offset,)) for offset in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "iterations": iterations,
+        "threads": threads,
+        "errors": errors[0],
+        "elapsed_s": round(elapsed, 6),
+        "throughput_ops_s": round(iterations / elapsed, 2) if elapsed else None,
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies) * 1000, 4) if latencies else None,
+            "p50": round(percentile(latencies, 0.50) * 1000, 4) if latencies else None,
+            "p95": round(percentile(latencies, 0.95) * 1000, 4) if latencies else None,
+            "p99": round(percentile(latencies, 0.99) * 1000, 4) if latencies else None,
+            "max": round(latencies[-1] * 1000, 4) if latencies else None,
+        },
+    }
+
+
+def build_scenarios(service, rows, seed):
+    """Return the benchmark operations keyed by scenario name."""
+    rng = random.Random(seed)
+    existing = [rng.randrange(rows) for _ in range(min(rows, 100000))]
+
+    def login(i):
+        index = existing[i % len(existing)]
+        if service.authenticate(synthetic_username(index), synthetic_pin(index)) is None:
+            raise AssertionError("synthetic login failed")
+
+    def forgot_pin(i):
+        index = existing[i % len(existing)]
+        service.get_security_question(synthetic_username(index))
+        service.verify_security_answer(synthetic_username(index), f"answer{index}")
+
+    def signup(i):
+        index = rows + i
+        service.create_account(f"First{index}", f"Last{index}", f"{index} Main St", "", ACCOUNT_TYPES[1],
+                               synthetic_username(index), synthetic_pin(index), SECURITY_QUESTIONS[1],
+                               f"answer{index}")
+
+    def reset_pin(i):
+        index = existing[i % len(existing)]
+        service.reset_pin(synthetic_username(index), synthetic_pin(index))
+
+    # The login lookup alone, without the PIN hash: projected onto the covering index, and the
+    # original full-row query for comparison
+    def lookup_covering(i):
+        index = existing[i % len(existing)]
+        with database.connect_db() as conn:
+            queries.execute(conn, "authenticate", (synthetic_username(index),)).fetchone()
+
+    def lookup_full_row(i):
+        index = existing[i % len(existing)]
+        with database.connect_db() as conn:
+            conn.execute("SELECT * FROM accounts WHERE username=?", (synthetic_username(index),)).fetchone()
+
+    return {"login": login, "forgot_pin": forgot_pin, "signup": signup, "reset_pin": reset_pin,
+            "lookup_covering": lookup_covering, "lookup_full_row": lookup_full_row}
+
+
+def main():
+    """Run the benchmark suite from the command line."""
+    parser = argparse.ArgumentParser(description="Benchmark login, signup, forgot-PIN and PIN reset.")
+    parser.add_argument("--rows", type=int, default=10000, help="synthetic accounts to generate (10k to 10M)")
+    parser.add_argument("--iterations", type=int, default=5000, help="operations per scenario")
+    parser.add_argument("--threads", type=int, default=1, help="concurrent client threads")
+    parser.add_argument("--scenarios", default="login,signup,forgot_pin,reset_pin",
+                        help="comma-separated scenarios to run")
+    parser.add_argument("--profile", default=config.DB_PROFILE, choices=sorted(database.PRAGMA_PROFILES))
+    parser.add_argument("--kdf-target-ms", type=float, default=config.KDF_TARGET_MS,
+                        help="PIN hash latency budget the KDF is calibrated to")
+    parser.add_argument("--write-behind", action="store_true",
+                        help="batch signup and PIN reset writes through the write-behind queue")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--keep-db", action="store_true", help="keep the temporary database for inspection")
+    parser.add_argument("--output", help="write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    kdf_params = hashing.calibrate_kdf(args.kdf_target_ms)
+    workdir = tempfile.mkdtemp(prefix="accounts-bench-")
+    path = os.path.join(workdir, "accounts.db")
+    try:
+        database.configure_pool(path=path, size=max(args.threads, 1), pragmas=database.get_profile(args.profile))
+        database.setup_db()
+        started = time.perf_counter()
+        generate_accounts(path, args.rows)
+        generate_seconds = time.perf_counter() - started
+        # Report the statement cache counters of the scenarios only
+        queries.stats = queries.QueryStats()
+
+        # Every synthetic login comes from one source; an unconfigured limiter keeps throttling out of the numbers
+        service = AccountService(username_filter=UsernameFilter(path=f"{path}.usernames.bloom"),
+                                 limiter=RateLimiter(scopes={}, lockout_seconds=0, max_keys=0),
+                                 write_queue=WriteBehindQueue() if args.write_behind else None)
+        scenarios = build_scenarios(service, args.rows, args.seed)
+        results = {}
+        for name in args.scenarios.split(","):
+            name = name.strip()
+            if name not in scenarios:
+                parser.error(f"unknown scenario: {name}")
+            results[name] = run_scenario(scenarios[name], args.iterations, args.threads)
+        service.close()
+
+        report = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "profile": args.profile,
+            "kdf": list(kdf_params),
+            "rows": args.rows,
+            "generate_s": round(generate_seconds, 3),
+            "pool": database.pool_stats(),
+            "queries": queries.stats.as_dict(),
+            "recovery_cache": service.recovery_cache.stats.as_dict(),
+            "throttle": service.limiter.stats.as_dict(),
+            "username_filter": service.username_filter.stats(),
+            "write_batches": service.write_queue.batches if service.write_queue else None,
+            "scenarios": results,
+        }
+    finally:
+        database.close_pool()
+        if args.keep_db:
+            print(f"Kept benchmark database at {path}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
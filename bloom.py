@@ -0,0 +1,199 @@
+# Description: Bloom filter over existing usernames for fast availability checks.
+# A Bloom filter answers "definitely not present" or "probably present" from a compact bit array.
+# Most usernames typed during signup are free, so most availability checks are answered from memory
+# and only probable hits are confirmed against the database. The filter is saved to a file and on
+# load it catches up on accounts added since it was saved (by accounts.id), or is rebuilt. While
+# running it catches up the same way at most every config.USERNAME_FILTER_SYNC_INTERVAL seconds, so
+# accounts inserted by other processes (a second server, the bulk importer) are not reported free.
+
+import hashlib
+import math
+import os
+import struct
+import threading
+import time
+
+import config
+from database import connect_db
+
+MAGIC = b"UBF1"
+HEADER = struct.Struct("<4sIQQQ")  # magic, hash count, bit count, item count, highest account id
+
+# Smallest capacity a filter is built for, and headroom over the current number of usernames
+MIN_CAPACITY = 100000
+GROWTH_FACTOR = 2
+
+# Save the filter to disk after this many additions
+SAVE_EVERY = 100
+
+
+class BloomFilter:
+    """A fixed-size Bloom filter of strings."""
+
+    def __init__(self, capacity, error_rate=0.01, bit_count=None, hash_count=None, bits=None, count=0):
+        self.capacity = capacity
+        self.bit_count = bit_count or max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = hash_count or max(1, round(self.bit_count / capacity * math.log(2)))
+        self.bits = bits if bits is not None else bytearray((self.bit_count + 7) // 8)
+        self.count = count
+
+    def _positions(self, item):
+        """Return the bit positions of an item (double hashing over one BLAKE2b digest)."""
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first, second = struct.unpack("<QQ", digest)
+        second |= 1  # an odd step visits distinct positions
+        return [(first + i * second) % self.bit_count for i in range(self.hash_count)]
+
+    def add(self, item):
+        """Add an item to the filter."""
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def false_positive_rate(self):
+        """Return the expected false positive rate at the current fill level."""
+        return (1 - math.exp(-self.hash_count * self.count / self.bit_count)) ** self.hash_count
+
+
+class UsernameFilter:
+    """The Bloom filter of taken usernames, kept in sync with the accounts table."""
+
+    def __init__(self, path=None, error_rate=None, connect=connect_db, sync_interval=None):
+        self.path = path or config.USERNAME_FILTER_PATH
+        self.error_rate = config.USERNAME_FILTER_ERROR_RATE if error_rate is None else error_rate
+        self.connect = connect
+        self.sync_interval = config.USERNAME_FILTER_SYNC_INTERVAL if sync_interval is None else sync_interval
+        self.filter = None
+        self.max_id = 0
+        self.synced_at = 0.0
+        self.checks = 0
+        self.negatives = 0
+        self._unsaved = 0
+        self._lock = threading.Lock()
+
+    def ensure_loaded(self):
+        """Load the filter from disk or the database if that has not happened yet."""
+        with self._lock:
+            if self.filter is None:
+                self._load()
+            return self.filter
+
+    def _load(self):
+        """Read the saved filter, catch up on new accounts, or rebuild it from scratch."""
+        loaded = self._read_file()
+        with self.connect() as conn:
+            total, max_id = conn.execute("SELECT COUNT(*), COALESCE(MAX(id), 0) FROM accounts").fetchone()
+            if loaded is None or loaded[1] > max_id or total > loaded[0].capacity:
+                self._rebuild(conn, total)
+                return
+            self.filter, self.max_id = loaded
+            if self._catch_up(conn):
+                self._save()
+
+    def _catch_up(self, conn):
+        """Add the usernames of rows inserted since the last load or sync. Return True if any were new.
+
+        The row at max_id is read again, in case it was deleted and its id reused by a new account.
+        """
+        added = False
+        for account_id, username in conn.execute("SELECT id, username FROM accounts WHERE id >= ?",
+                                                 (self.max_id,)):
+            if username is not None and username not in self.filter:
+                self.filter.add(username)
+                self._unsaved += 1
+                added = True
+            self.max_id = max(self.max_id, account_id)
+        self.synced_at = time.monotonic()
+        return added
+
+    def sync(self):
+        """Catch up on accounts inserted by other connections or processes."""
+        self.ensure_loaded()
+        with self._lock, self.connect() as conn:
+            self._catch_up(conn)
+            if self.filter.count > self.filter.capacity:
+                total, = conn.execute("SELECT COUNT(*) FROM accounts").fetchone()
+                self._rebuild(conn, total)
+
+    def _rebuild(self, conn, total):
+        """Build a new filter from every username in the database."""
+        self.filter = BloomFilter(max(MIN_CAPACITY, total * GROWTH_FACTOR), self.error_rate)
+        self.max_id = 0
+        for account_id, username in conn.execute("SELECT id, username FROM accounts"):
+            if username is not None:
+                self.filter.add(username)
+            self.max_id = max(self.max_id, account_id)
+        self.synced_at = time.monotonic()
+        self._save()
+
+    def _read_file(self):
+        """Return (filter, highest account id) from the saved file, or None if it is missing or invalid."""
+        try:
+            with open(self.path, "rb") as file:
+                magic, hash_count, bit_count, count, max_id = HEADER.unpack(file.read(HEADER.size))
+                bits = bytearray(file.read())
+        except (OSError, struct.error):
+            return None
+        if magic != MAGIC or len(bits) != (bit_count + 7) // 8:
+            return None
+        capacity = max(1, round(bit_count * math.log(2) ** 2 / -math.log(self.error_rate)))
+        return BloomFilter(capacity, self.error_rate, bit_count, hash_count, bits, count), max_id
+
+    def _save(self):
+        """Write the filter to disk atomically."""
+        temp_path = f"{self.path}.tmp"
+        try:
+            with open(temp_path, "wb") as file:
+                file.write(HEADER.pack(MAGIC, self.filter.hash_count, self.filter.bit_count, self.filter.count,
+                                       self.max_id))
+                file.write(self.filter.bits)
+            os.replace(temp_path, self.path)
+            self._unsaved = 0
+        except OSError as e:
+            print(f"Error: could not save username filter - {str(e)}")
+
+    def save(self):
+        """Write the filter to disk if it has unsaved additions."""
+        with self._lock:
+            if self.filter is not None and self._unsaved:
+                self._save()
+
+    def add(self, username):
+        """Record a newly taken username.
+
+        max_id is left alone: other processes may have inserted rows below this one, and the
+        next load must still catch up on them.
+        """
+        bloom = self.ensure_loaded()
+        with self._lock:
+            bloom.add(username)
+            self._unsaved += 1
+            if bloom.count > bloom.capacity:
+                # Past its capacity the false positive rate climbs quickly; size a new filter
+                with self.connect() as conn:
+                    total, = conn.execute("SELECT COUNT(*) FROM accounts").fetchone()
+                    self._rebuild(conn, total)
+            elif self._unsaved >= SAVE_EVERY:
+                self._save()
+
+    def might_contain(self, username):
+        """Return False if the username is certainly free, True if it is probably taken."""
+        present = username in self.ensure_loaded()
+        if not present and time.monotonic() - self.synced_at >= self.sync_interval:
+            # A negative answer must not miss rows other processes inserted since the last sync
+            self.sync()
+            present = username in self.filter
+        self.checks += 1
+        if not present:
+            self.negatives += 1
+        return present
+
+    def stats(self):
+        """Return the size and usage counters of the filter."""
+        bloom = self.ensure_loaded()
+        return {"items": bloom.count, "capacity": bloom.capacity, "bits": bloom.bit_count,
+                "hash_count": bloom.hash_count, "expected_false_positive_rate": round(bloom.false_positive_rate(), 6),
+                "max_id": self.max_id, "checks": self.checks, "negatives": self.negatives}
@@ -0,0 +1,203 @@
+# Description: Command-line bulk importer for accounts.
+# Streams a CSV or JSONL file, applies the same validation as the Create Account window, hashes the
+# PINs in parallel and inserts each batch in one transaction with executemany. Rejected rows are
+# written to a side file as they are found, so the input is never loaded into memory as a whole.
+#
+# Usage: python bulk_import.py INPUT [--format csv|jsonl] [--rejects FILE] [--batch-size N] [--workers N]
+
+import argparse
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import database
+import queries
+from account_service import NEW_ACCOUNT_FIELDS, ValidationError, validate_new_account
+from bloom import UsernameFilter
+from hashing import hash_pins
+
+# Rows validated, hashed and inserted per transaction
+DEFAULT_BATCH_SIZE = 10000
+
+# Usernames per SELECT when checking a batch for existing accounts (below SQLite's parameter limit)
+LOOKUP_CHUNK_SIZE = 500
+
+# Secrets left out of the rejects file
+REDACTED_FIELDS = ("pin", "security_answer")
+
+
+def read_records(path, file_format):
+    """Yield (line number, record dict) pairs from a CSV or JSONL file; the record is None if unparseable."""
+    with open(path, newline="", encoding="utf-8") as file:
+        if file_format == "csv":
+            reader = csv.DictReader(file)
+            for record in reader:
+                yield reader.line_num, record
+        else:
+            for line_number, line in enumerate(file, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    record = None
+                # The raw line is not kept: it may hold a PIN or security answer
+                yield line_number, record if isinstance(record, dict) else None
+
+
+def clean_record(record):
+    """Return the account fields of a record as stripped strings, or raise ValidationError."""
+    if record is None:
+        raise ValidationError("Line is not a JSON object.")
+    values = []
+    for name in NEW_ACCOUNT_FIELDS:
+        value = record.get(name)
+        values.append("" if value is None else str(value).strip())
+    validate_new_account(*values)
+    return values
+
+
+def existing_usernames(conn, usernames):
+    """Return the subset of usernames that already have an account."""
+    existing = set()
+    usernames = list(usernames)
+    for start in range(0, len(usernames), LOOKUP_CHUNK_SIZE):
+        chunk = usernames[start:start + LOOKUP_CHUNK_SIZE]
+        placeholders = ", ".join("?" * len(chunk))
+        existing.update(row[0] for row in conn.execute(
+            f"SELECT username FROM accounts WHERE username IN ({placeholders})", chunk))
+    return existing
+
+
+class BulkImporter:
+    """Validate, hash and insert accounts in large batches."""
+
+    def __init__(self, rejects_file, batch_size=DEFAULT_BATCH_SIZE, workers=None):
+        self.rejects_file = rejects_file
+        self.batch_size = batch_size
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        self.read = 0
+        self.imported = 0
+        self.rejected = 0
+
+    def reject(self, line_number, record, error):
+        """Write a rejected record to the side file, without its PIN or security answer."""
+        rejected = {"line": line_number, "error": error}
+        if record is not None:
+            rejected["record"] = {name: value for name, value in record.items() if name not in REDACTED_FIELDS}
+        self.rejects_file.write(json.dumps(rejected) + "\n")
+        self.rejected += 1
+
+    def import_batch(self, batch):
+        """Validate, hash and insert one batch of (line number, record) pairs."""
+        self.read += len(batch)
+        valid = []
+        seen = set()
+        for line_number, record in batch:
+            try:
+                values = clean_record(record)
+            except ValidationError as e:
+                self.reject(line_number, record, str(e))
+                continue
+            username = values[NEW_ACCOUNT_FIELDS.index("username")]
+            if username in seen:
+                self.reject(line_number, record, "Duplicate username in input.")
+                continue
+            seen.add(username)
+            valid.append((line_number, record, values))
+        if not valid:
+            return
+
+        # Drop usernames that are already taken before paying for their PIN hashes
+        username_index = NEW_ACCOUNT_FIELDS.index("username")
+        with database.connect_db() as conn:
+            existing = existing_usernames(conn, seen)
+        valid = self._reject_existing(valid, existing)
+        if not valid:
+            return
+
+        # Hash every PIN of the batch on the process pool
+        pin_index = NEW_ACCOUNT_FIELDS.index("pin")
+        pin_hashes = hash_pins((values[pin_index] for _, _, values in valid), executor=self.executor,
+                               workers=self.workers)
+        for (_, _, values), pin_hash in zip(valid, pin_hashes):
+            values[pin_index] = pin_hash
+
+        with database.connect_db() as conn:
+            # Lock out other writers so no username can be taken between the check and the insert
+            conn.execute("BEGIN IMMEDIATE")
+            # Check again: another writer may have taken a username while the PINs were hashed
+            existing = existing_usernames(conn, (values[username_index] for _, _, values in valid))
+            rows = [values for _, _, values in self._reject_existing(valid, existing)]
+            queries.executemany(conn, "insert_account", rows)
+        self.imported += len(rows)
+
+    def _reject_existing(self, valid, existing):
+        """Reject the records whose username is in existing and return the others."""
+        if not existing:
+            return valid
+        username_index = NEW_ACCOUNT_FIELDS.index("username")
+        remaining = []
+        for line_number, record, values in valid:
+            if values[username_index] in existing:
+                self.reject(line_number, record, "Username already exists.")
+            else:
+                remaining.append((line_number, record, values))
+        return remaining
+
+    def run(self, records):
+        """Import every record of an iterable of (line number, record) pairs."""
+        records = iter(records)
+        while True:
+            batch = list(islice(records, self.batch_size))
+            if not batch:
+                break
+            self.import_batch(batch)
+
+    def close(self):
+        """Stop the hashing processes."""
+        self.executor.shutdown()
+
+
+def main():
+    """Run the bulk importer from the command line."""
+    parser = argparse.ArgumentParser(description="Import accounts from a CSV or JSONL file.")
+    parser.add_argument("input", help="CSV file with a header row, or JSONL file with one object per line")
+    parser.add_argument("--format", choices=("csv", "jsonl"), help="input format (default: from the extension)")
+    parser.add_argument("--rejects", help="file receiving rejected rows as JSONL (default: INPUT.rejects.jsonl)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="rows per transaction")
+    parser.add_argument("--workers", type=int, help="PIN hashing processes (default: CPU count)")
+    args = parser.parse_args()
+
+    file_format = args.format or ("jsonl" if os.path.splitext(args.input)[1].lower() in (".jsonl", ".json")
+                                  else "csv")
+    rejects_path = args.rejects or f"{args.input}.rejects.jsonl"
+
+    database.setup_db()
+    started = time.perf_counter()
+    with open(rejects_path, "w", encoding="utf-8") as rejects_file:
+        importer = BulkImporter(rejects_file, batch_size=args.batch_size, workers=args.workers)
+        try:
+            importer.run(read_records(args.input, file_format))
+            if importer.imported:
+                # Add the imported usernames to the saved filter so the next start does not catch up on them
+                username_filter = UsernameFilter()
+                username_filter.sync()
+                username_filter.save()
+        finally:
+            importer.close()
+            database.close_pool()
+    elapsed = time.perf_counter() - started
+
+    print(f"Read {importer.read} rows: imported {importer.imported}, rejected {importer.rejected} "
+          f"in {elapsed:.2f}s ({importer.read / elapsed if elapsed else 0:.0f} rows/s).")
+    if importer.rejected:
+        print(f"Rejected rows written to {rejects_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# Description: A small thread-safe in-memory cache with LRU eviction, per-entry TTL and a memory cap.
+# Used for authenticated sessions and other per-username data that would otherwise be re-read from
+# the database on every request.
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+# Expired entries are swept after this many writes, so the cache never fills up with dead entries
+PURGE_EVERY = 1000
+
+
+def approximate_size(key, value):
+    """Estimate the memory held by a cache entry, in bytes."""
+    size = sys.getsizeof(key) + sys.getsizeof(value)
+    if isinstance(value, (tuple, list)):
+        size += sum(sys.getsizeof(item) for item in value)
+    return size
+
+
+class CacheStats:
+    """Counters describing how a cache is being used."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def hit_rate(self):
+        """Return the fraction of lookups answered from the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def as_dict(self):
+        """Return the counters as a dictionary."""
+        stats = dict(vars(self))
+        stats["hit_rate"] = round(self.hit_rate(), 4)
+        return stats
+
+
+class TTLCache:
+    """A bounded mapping that evicts least recently used entries and drops expired ones.
+
+    max_entries and max_bytes bound the cache; whichever is hit first triggers eviction.
+    With sliding set, reading an entry extends its lifetime by another ttl seconds. on_remove, if
+    given, is called with the key and value of every entry that leaves the cache, under its lock.
+    """
+
+    def __init__(self, max_entries, ttl, max_bytes=None, sliding=False, on_remove=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sliding = sliding
+        self.on_remove = on_remove
+        self.stats = CacheStats()
+        self.bytes = 0
+        self._entries = OrderedDict()  # key -> (expires_at, value, size)
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default if it is missing or expired."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats.misses += 1
+                return default
+            expires_at, value, size = entry
+            if expires_at <= now:
+                self._remove(key)
+                self.stats.expirations += 1
+                self.stats.misses += 1
+                return default
+            if self.sliding:
+                self._entries[key] = (now + self.ttl, value, size)
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return value
+
+    def set(self, key, value):
+        """Store a value, evicting old entries if the cache is over its limits."""
+        size = approximate_size(key, value)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value, size)
+            self.bytes += size
+            self._writes += 1
+            if self._writes % PURGE_EVERY == 0:
+                self._purge_expired()
+            while self._entries and (len(self._entries) > self.max_entries
+                                     or (self.max_bytes is not None and self.bytes > self.max_bytes)):
+                self._remove(next(iter(self._entries)))
+                self.stats.evictions += 1
+
+    def pop(self, key, default=None):
+        """Remove an entry and return its value."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            self._remove(key)
+            self.stats.invalidations += 1
+            return entry[1]
+
+    def clear(self):
+        """Remove every entry."""
+        with self._lock:
+            if self.on_remove is not None:
+                for key, (_, value, _) in self._entries.items():
+                    self.on_remove(key, value)
+            self._entries.clear()
+            self.bytes = 0
+
+    def _remove(self, key):
+        _, value, size = self._entries.pop(key)
+        self.bytes -= size
+        if self.on_remove is not None:
+            self.on_remove(key, value)
+
+    def _purge_expired(self):
+        now = time.monotonic()
+        expired = [key for key, (expires_at, _, _) in self._entries.items() if expires_at <= now]
+        for key in expired:
+            self._remove(key)
+        self.stats.expirations += len(expired)
@@ -0,0 +1,117 @@
+# Description: Runtime settings for the account management system.
+# Every value has a sensible default and can be overridden with an environment variable,
+# so deployments can tune the program without editing code.
+
+import os
+
+
+def env_int(name, default):
+    """Read an integer setting from the environment."""
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def env_float(name, default):
+    """Read a float setting from the environment."""
+    value = os.environ.get(name)
+    return float(value) if value else default
+
+
+def env_str(name, default):
+    """Read a string setting from the environment."""
+    return os.environ.get(name) or default
+
+
+# Path of the SQLite database file
+DB_PATH = env_str("ACCOUNTS_DB_PATH", "accounts.db")
+
+# Connection pool settings
+POOL_SIZE = env_int("ACCOUNTS_POOL_SIZE", 4)
+POOL_TIMEOUT = env_float("ACCOUNTS_POOL_TIMEOUT", 5.0)
+POOL_HEALTH_CHECK_INTERVAL = env_float("ACCOUNTS_POOL_HEALTH_CHECK_INTERVAL", 30.0)
+
+# Prepared statements kept per pooled connection (sqlite3's cached_statements); comfortably above the
+# number of distinct statements the program runs, so hot queries are never re-prepared
+STATEMENT_CACHE_SIZE = env_int("ACCOUNTS_STATEMENT_CACHE_SIZE", 128)
+
+# PRAGMA profile applied to every connection ("fast" or "durable", see database.PRAGMA_PROFILES)
+DB_PROFILE = env_str("ACCOUNTS_DB_PROFILE", "fast")
+
+# Seconds between background WAL checkpoints (0 disables the checkpoint thread)
+CHECKPOINT_INTERVAL = env_float("ACCOUNTS_CHECKPOINT_INTERVAL", 60.0)
+
+# Background worker threads used by the GUI, and how often (ms) Tk polls them for results
+WORKER_THREADS = env_int("ACCOUNTS_WORKER_THREADS", 4)
+WORKER_POLL_INTERVAL = env_int("ACCOUNTS_WORKER_POLL_INTERVAL", 20)
+
+# HTTP server settings (server.py)
+SERVER_HOST = env_str("ACCOUNTS_SERVER_HOST", "127.0.0.1")
+SERVER_PORT = env_int("ACCOUNTS_SERVER_PORT", 8080)
+SERVER_WORKERS = env_int("ACCOUNTS_SERVER_WORKERS", 8)
+SERVER_MAX_CONCURRENCY = env_int("ACCOUNTS_SERVER_MAX_CONCURRENCY", 256)
+SERVER_QUEUE_TIMEOUT = env_float("ACCOUNTS_SERVER_QUEUE_TIMEOUT", 2.0)
+SERVER_KEEPALIVE_TIMEOUT = env_float("ACCOUNTS_SERVER_KEEPALIVE_TIMEOUT", 15.0)
+
+# Target time (ms) for one PIN hash; the KDF work factor is calibrated to it at startup
+KDF_TARGET_MS = env_float("ACCOUNTS_KDF_TARGET_MS", 50.0)
+
+# Authenticated sessions: idle lifetime (seconds), and caps on entry count and memory (bytes)
+SESSION_TTL = env_float("ACCOUNTS_SESSION_TTL", 1800.0)
+SESSION_MAX_ENTRIES = env_int("ACCOUNTS_SESSION_MAX_ENTRIES", 100000)
+SESSION_MAX_BYTES = env_int("ACCOUNTS_SESSION_MAX_BYTES", 64 * 1024 * 1024)
+
+# Read-through cache of security questions and answer digests for the forgot-PIN flow: most usernames
+# held, and seconds an entry lives
+RECOVERY_CACHE_SIZE = env_int("ACCOUNTS_RECOVERY_CACHE_SIZE", 10000)
+RECOVERY_CACHE_TTL = env_float("ACCOUNTS_RECOVERY_CACHE_TTL", 300.0)
+
+# Write-behind batching of signups and PIN resets (writebehind.py), off unless ACCOUNTS_WRITE_BEHIND=1:
+# queued writes allowed, longest wait (ms) before a batch is committed, most writes per transaction,
+# seconds a caller waits for room in a full queue, and seconds it waits for its write to be committed
+WRITE_BEHIND = bool(env_int("ACCOUNTS_WRITE_BEHIND", 0))
+WRITE_QUEUE_SIZE = env_int("ACCOUNTS_WRITE_QUEUE_SIZE", 10000)
+WRITE_FLUSH_INTERVAL_MS = env_float("ACCOUNTS_WRITE_FLUSH_INTERVAL_MS", 10.0)
+WRITE_MAX_BATCH = env_int("ACCOUNTS_WRITE_MAX_BATCH", 500)
+WRITE_SUBMIT_TIMEOUT = env_float("ACCOUNTS_WRITE_SUBMIT_TIMEOUT", 5.0)
+WRITE_COMMIT_TIMEOUT = env_float("ACCOUNTS_WRITE_COMMIT_TIMEOUT", 30.0)
+
+# Bloom filter of taken usernames: file it is saved to, and target false positive rate
+USERNAME_FILTER_PATH = env_str("ACCOUNTS_USERNAME_FILTER_PATH", f"{DB_PATH}.usernames.bloom")
+USERNAME_FILTER_ERROR_RATE = env_float("ACCOUNTS_USERNAME_FILTER_ERROR_RATE", 0.01)
+# Longest time (seconds) a "username is free" answer may go without reading newly inserted accounts
+USERNAME_FILTER_SYNC_INTERVAL = env_float("ACCOUNTS_USERNAME_FILTER_SYNC_INTERVAL", 1.0)
+
+# Delay (ms) after the last keystroke before the Create Account form is validated
+VALIDATION_DEBOUNCE_MS = env_int("ACCOUNTS_VALIDATION_DEBOUNCE_MS", 300)
+
+# Brute-force throttling of login and security-answer attempts: bucket size and refill rate per
+# username and per source (client address), lockout (seconds) once a bucket is empty, the most keys
+# tracked, and the file the buckets are saved to every THROTTLE_PERSIST_INTERVAL seconds
+THROTTLE_USER_CAPACITY = env_int("ACCOUNTS_THROTTLE_USER_CAPACITY", 5)
+THROTTLE_USER_REFILL_PER_MINUTE = env_float("ACCOUNTS_THROTTLE_USER_REFILL_PER_MINUTE", 1.0)
+THROTTLE_SOURCE_CAPACITY = env_int("ACCOUNTS_THROTTLE_SOURCE_CAPACITY", 50)
+THROTTLE_SOURCE_REFILL_PER_MINUTE = env_float("ACCOUNTS_THROTTLE_SOURCE_REFILL_PER_MINUTE", 20.0)
+THROTTLE_LOCKOUT_SECONDS = env_float("ACCOUNTS_THROTTLE_LOCKOUT_SECONDS", 300.0)
+THROTTLE_MAX_KEYS = env_int("ACCOUNTS_THROTTLE_MAX_KEYS", 100000)
+THROTTLE_STATE_PATH = env_str("ACCOUNTS_THROTTLE_STATE_PATH", f"{DB_PATH}.throttle.json")
+THROTTLE_PERSIST_INTERVAL = env_float("ACCOUNTS_THROTTLE_PERSIST_INTERVAL", 30.0)
+
+# Timing instrumentation (metrics.py): set ACCOUNTS_METRICS=1 to record. With METRICS_FILE set, the
+# Prometheus text export is rewritten there every METRICS_EXPORT_INTERVAL seconds
+METRICS_ENABLED = bool(env_int("ACCOUNTS_METRICS", 0))
+METRICS_FILE = env_str("ACCOUNTS_METRICS_FILE", "")
+METRICS_EXPORT_INTERVAL = env_float("ACCOUNTS_METRICS_EXPORT_INTERVAL", 15.0)
+
+# Slow-query log (slowlog.py): statements slower than SLOW_QUERY_MS milliseconds are logged with their
+# query plan to a file rotated at SLOW_QUERY_LOG_MAX_BYTES, keeping SLOW_QUERY_LOG_BACKUPS old files.
+# 0 turns the log off
+SLOW_QUERY_MS = env_float("ACCOUNTS_SLOW_QUERY_MS", 0.0)
+SLOW_QUERY_LOG = env_str("ACCOUNTS_SLOW_QUERY_LOG", f"{DB_PATH}.slow.log")
+SLOW_QUERY_LOG_MAX_BYTES = env_int("ACCOUNTS_SLOW_QUERY_LOG_MAX_BYTES", 10 * 1024 * 1024)
+SLOW_QUERY_LOG_BACKUPS = env_int("ACCOUNTS_SLOW_QUERY_LOG_BACKUPS", 5)
+
+# Draw the login window before setting up the database, which then happens on a worker thread
+FAST_START = bool(env_int("ACCOUNTS_FAST_START", 1))
+
+# Seconds the GUI allows for a clean shutdown (draining tasks, flushing writes, closing the database)
+SHUTDOWN_DEADLINE = env_float("ACCOUNTS_SHUTDOWN_DEADLINE", 10.0)
@@ -0,0 +1,404 @@
+# Description: Database access for the account management system.
+# Connections to the SQLite database are kept in a bounded, thread-safe pool so that
+# every handler reuses a warm connection instead of opening a new one per call.
+
+import sqlite3
+import threading
+import time
+
+import config
+import metrics
+import migrations
+import slowlog
+
+# PRAGMA statements applied to every new pooled connection, by profile name.
+# Both profiles use WAL so login reads never wait behind signup or reset writes;
+# "durable" keeps a full fsync on every commit, "fast" only syncs at checkpoints.
+# wal_autocheckpoint is switched to 0 while the background Checkpointer runs (see start_checkpointer).
+PRAGMA_PROFILES = {
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": -16384,  # negative values are KiB, so 16 MiB
+        "mmap_size": 0,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+        "wal_autocheckpoint": 1000,
+    },
+    "fast": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -65536,  # 64 MiB
+        "mmap_size": 268435456,  # 256 MiB
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+        "wal_autocheckpoint": 1000,
+    },
+}
+
+
+def get_profile(name=None):
+    """Return the PRAGMA settings of a profile, defaulting to the configured one."""
+    name = name or config.DB_PROFILE
+    try:
+        return PRAGMA_PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown database profile: {name!r}") from None
+
+
+class PoolConnection(sqlite3.Connection):
+    """Connection that remembers which registered queries (see queries.py) it has prepared."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared_queries = set()
+        self.pragmas = {}  # PRAGMA settings applied to this connection
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that times every statement it executes for the metrics and the slow-query log."""
+
+    def _observe(self, sql, parameters, elapsed, count=1):
+        metrics.observe("sql_statement_seconds", elapsed, statement=metrics.statement_label(sql))
+        slowlog.record(self.connection, sql, parameters, elapsed, count)
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._observe(sql, parameters, time.perf_counter() - started)
+
+    def executemany(self, sql, seq_of_parameters):
+        # Keep the parameters so the slow-query log can explain the statement with the first row
+        seq_of_parameters = list(seq_of_parameters)
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._observe(sql, seq_of_parameters[0] if seq_of_parameters else (), time.perf_counter() - started,
+                          len(seq_of_parameters))
+
+
+class InstrumentedConnection(PoolConnection):
+    """Connection whose statements, including Connection.execute shortcuts, go through InstrumentedCursor."""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def connection_factory():
+    """Return the connection class to use: instrumented only while metrics or the slow-query log are on."""
+    return InstrumentedConnection if metrics.is_enabled() or slowlog.is_enabled() else PoolConnection
+
+
+class PoolTimeoutError(sqlite3.OperationalError):
+    """Raised when no pooled connection becomes available in time."""
+
+
+class PoolStats:
+    """Counters describing how the connection pool is being used."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.health_check_failures = 0
+        self.timeouts = 0
+
+    def as_dict(self):
+        """Return the counters as a dictionary."""
+        return dict(vars(self))
+
+
+class ConnectionPool:
+    """A bounded pool of SQLite connections shared between threads."""
+
+    def __init__(self, path=None, size=None, timeout=None, pragmas=None, health_check_interval=None):
+        self.path = path or config.DB_PATH
+        self.size = size or config.POOL_SIZE
+        self.timeout = config.POOL_TIMEOUT if timeout is None else timeout
+        self.pragmas = _default_pragmas() if pragmas is None else dict(pragmas)
+        self.health_check_interval = (config.POOL_HEALTH_CHECK_INTERVAL if health_check_interval is None
+                                      else health_check_interval)
+        self.stats = PoolStats()
+        self._idle = []  # (connection, time it was returned)
+        self._created = 0
+        self._closed = False
+        self._lock = threading.Condition()
+
+    def _create_connection(self):
+        """Open a new connection and apply the configured PRAGMAs."""
+        conn = sqlite3.connect(self.path, check_same_thread=False, factory=connection_factory(),
+                               cached_statements=config.STATEMENT_CACHE_SIZE)
+        self._apply_pragmas(conn)
+        return conn
+
+    def _apply_pragmas(self, conn):
+        """Bring a connection's PRAGMA settings in line with the pool's."""
+        for name, value in self.pragmas.items():
+            if conn.pragmas.get(name) != value:
+                conn.execute(f"PRAGMA {name}={value}")
+                conn.pragmas[name] = value
+
+    def set_pragma(self, name, value):
+        """Change a PRAGMA for new connections; existing ones pick it up at their next checkout."""
+        with self._lock:
+            self.pragmas = dict(self.pragmas, **{name: value})
+
+    def _is_healthy(self, conn, idle_since):
+        """Check that an idle connection still works."""
+        if time.monotonic() - idle_since < self.health_check_interval:
+            return True
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def acquire(self):
+        """Take a connection from the pool, opening one if the pool is not full."""
+        started = None
+        conn = None
+        with self._lock:
+            while True:
+                if self._closed:
+                    raise sqlite3.ProgrammingError("Connection pool is closed.")
+                if self._idle:
+                    conn, idle_since = self._idle.pop()
+                    if self._is_healthy(conn, idle_since):
+                        self._apply_pragmas(conn)
+                        self.stats.hits += 1
+                        break
+                    self.stats.health_check_failures += 1
+                    self._created -= 1
+                    conn.close()
+                    conn = None
+                    continue
+                if self._created < self.size:
+                    # Reserve the slot; the connection is opened below, outside the lock
+                    self._created += 1
+                    self.stats.misses += 1
+                    break
+                # Pool exhausted: wait for another thread to release a connection
+                if started is None:
+                    started = time.monotonic()
+                    self.stats.waits += 1
+                remaining = self.timeout - (time.monotonic() - started)
+                if remaining <= 0 or not self._lock.wait(remaining):
+                    if not self._idle and self._created >= self.size:
+                        self.stats.timeouts += 1
+                        raise PoolTimeoutError("Timed out waiting for a database connection.")
+            if started is not None:
+                self.stats.wait_time += time.monotonic() - started
+            self.stats.checkouts += 1
+        if conn is not None:
+            return conn
+        # Opening can wait on the busy timeout; other threads keep acquiring and releasing meanwhile
+        try:
+            return self._create_connection()
+        except sqlite3.Error:
+            with self._lock:
+                self._created -= 1
+                self._lock.notify()
+            raise
+
+    def release(self, conn):
+        """Return a connection to the pool."""
+        with self._lock:
+            if self._closed:
+                self._created -= 1
+                conn.close()
+                return
+            self._idle.append((conn, time.monotonic()))
+            self._lock.notify()
+
+    def discard(self, conn):
+        """Drop a broken connection instead of returning it to the pool."""
+        with self._lock:
+            self._created -= 1
+            self._lock.notify()
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def connection(self):
+        """Return a context manager that borrows a connection for one transaction."""
+        return PooledConnection(self)
+
+    def close(self):
+        """Close every idle connection and refuse further checkouts."""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._created -= len(idle)
+            self._lock.notify_all()
+        for conn, _ in idle:
+            conn.close()
+
+
+class PooledConnection:
+    """Context manager that commits or rolls back, then hands the connection back."""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.conn = None
+
+    def __enter__(self):
+        with metrics.timer("db_connect_seconds"):
+            self.conn = self.pool.acquire()
+        return self.conn
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        conn, self.conn = self.conn, None
+        try:
+            if exc_type is None:
+                conn.commit()
+            else:
+                conn.rollback()
+        except sqlite3.Error:
+            self.pool.discard(conn)
+            raise
+        self.pool.release(conn)
+        return False
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the shared connection pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool()
+        return _pool
+
+
+def configure_pool(**kwargs):
+    """Replace the shared connection pool with one built from the given settings."""
+    global _pool
+    with _pool_lock:
+        old_pool, _pool = _pool, ConnectionPool(**kwargs)
+    if old_pool is not None:
+        old_pool.close()
+    return _pool
+
+
+def close_pool():
+    """Close the shared connection pool."""
+    global _pool
+    with _pool_lock:
+        old_pool, _pool = _pool, None
+    if old_pool is not None:
+        old_pool.close()
+
+
+def pool_stats():
+    """Return the usage counters of the shared connection pool."""
+    return get_pool().stats.as_dict()
+
+
+def connect_db():
+    """Borrow a connection to the SQLite database from the shared pool."""
+    return get_pool().connection()
+
+
+def setup_db():
+    """Set up the SQLite database and bring its schema up to date."""
+    with connect_db() as conn:
+        conn.execute('''CREATE TABLE IF NOT EXISTS accounts
+                        (first_name TEXT, last_name TEXT, address_line1 TEXT, address_line2 TEXT,
+                         account_type TEXT, username TEXT, pin TEXT, security_question TEXT, security_answer TEXT)''')
+        migrations.migrate(conn)
+
+
+def checkpoint(mode="PASSIVE", path=None):
+    """Run a WAL checkpoint and return SQLite's (busy, log pages, checkpointed pages) result."""
+    conn = sqlite3.connect(path or config.DB_PATH)
+    try:
+        return conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+    finally:
+        conn.close()
+
+
+class Checkpointer(threading.Thread):
+    """Background thread that checkpoints the WAL at a fixed interval.
+
+    SQLite's wal_autocheckpoint runs inside whichever commit crosses the threshold, so a
+    signup occasionally pays for it. While this thread runs, pooled connections have
+    wal_autocheckpoint set to 0 and the WAL is kept short without charging the cost to a
+    user request.
+    """
+
+    def __init__(self, interval=None, path=None):
+        super().__init__(name="wal-checkpointer", daemon=True)
+        self.interval = config.CHECKPOINT_INTERVAL if interval is None else interval
+        self.path = path
+        self.last_result = None
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.last_result = checkpoint("PASSIVE", self.path)
+            except sqlite3.Error as e:
+                print(f"Error: WAL checkpoint failed - {str(e)}")
+
+    def stop(self):
+        """Stop the thread after its current checkpoint."""
+        self._stop_event.set()
+
+
+_checkpointer = None
+
+
+def _default_pragmas():
+    """Return the PRAGMAs for a new pool: the profile's, without autocheckpoints while the checkpointer runs."""
+    pragmas = dict(get_profile())
+    if _checkpointer is not None:
+        pragmas["wal_autocheckpoint"] = 0
+    return pragmas
+
+
+def start_checkpointer():
+    """Start the background WAL checkpoint thread if it is enabled and not running."""
+    global _checkpointer
+    if config.CHECKPOINT_INTERVAL <= 0 or get_profile().get("journal_mode") != "WAL":
+        return None
+    if _checkpointer is None or not _checkpointer.is_alive():
+        _checkpointer = Checkpointer()
+        _checkpointer.start()
+    # Commits no longer checkpoint on their own; the thread does it for them
+    get_pool().set_pragma("wal_autocheckpoint", 0)
+    return _checkpointer
+
+
+def stop_checkpointer():
+    """Stop the background WAL checkpoint thread and hand checkpointing back to SQLite."""
+    global _checkpointer
+    if _checkpointer is not None:
+        _checkpointer.stop()
+        _checkpointer = None
+        with _pool_lock:
+            pool = _pool
+        if pool is not None:
+            pool.set_pragma("wal_autocheckpoint", get_profile().get("wal_autocheckpoint", 1000))
+
+
+def shutdown_db():
+    """Stop the checkpointer, fold the WAL back into the database file and close the pool."""
+    stop_checkpointer()
+    close_pool()
+    if get_profile().get("journal_mode") == "WAL":
+        checkpoint("TRUNCATE")
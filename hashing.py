@@ -0,0 +1,178 @@
+# Description: PIN hashing for the account management system.
+# PINs are hashed with salted scrypt (PBKDF2-SHA256 where scrypt is unavailable). The work factor
+# is calibrated once per process to a target latency, because a 4-digit PIN space is tiny and only
+# a slow, salted hash stops all 10,000 values from being precomputed. Legacy unsalted SHA-256
+# hashes still verify, and needs_rehash() tells callers when to upgrade a stored hash.
+#
+# hash_pins() hashes a whole batch for bulk jobs such as imports and re-hash migrations. It splits
+# the batch into chunks, fans them out across a process pool (or a thread pool, since hashlib
+# releases the GIL while hashing) and returns the hashes in input order.
+
+import functools
+import hashlib
+import hmac
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+import metrics
+
+# Batches smaller than this are hashed inline; pool start-up would cost more than it saves
+PARALLEL_THRESHOLD = 8
+
+# Chunks handed to each worker per batch, so uneven chunks still balance out
+CHUNKS_PER_WORKER = 4
+
+SALT_BYTES = 16
+
+# scrypt block size and parallelism; only the CPU/memory cost n is calibrated
+SCRYPT_R = 8
+SCRYPT_P = 1
+MIN_SCRYPT_N = 2 ** 12
+MAX_SCRYPT_N = 2 ** 20
+
+# PBKDF2 fallback iteration bounds
+MIN_PBKDF2_ITERATIONS = 50000
+MAX_PBKDF2_ITERATIONS = 5000000
+
+_kdf_params = None
+_dummy_hash = None
+
+
+def legacy_hash_pin(pin):
+    """Hash the PIN using unsalted SHA-256, the format used before salted hashing."""
+    return hashlib.sha256(pin.encode()).hexdigest()
+
+
+def is_legacy_hash(stored):
+    """Return True if a stored hash is an unsalted SHA-256 digest."""
+    return "$" not in stored
+
+
+def _scrypt(pin, salt, n):
+    """Run scrypt with the given cost."""
+    return hashlib.scrypt(pin.encode(), salt=salt, n=n, r=SCRYPT_R, p=SCRYPT_P,
+                          maxmem=256 * SCRYPT_R * (n + SCRYPT_P + 2), dklen=32)
+
+
+def _pbkdf2(pin, salt, iterations):
+    """Run PBKDF2-SHA256 with the given iteration count."""
+    return hashlib.pbkdf2_hmac("sha256", pin.encode(), salt, iterations)
+
+
+def calibrate_kdf(target_ms=None):
+    """Pick the largest work factor whose hash time stays within target_ms, and use it from now on."""
+    global _kdf_params
+    target = (config.KDF_TARGET_MS if target_ms is None else target_ms) / 1000
+    salt = b"calibration-salt"
+    if hasattr(hashlib, "scrypt"):
+        cost, limit, kdf = MIN_SCRYPT_N, MAX_SCRYPT_N, _scrypt
+    else:
+        cost, limit, kdf = MIN_PBKDF2_ITERATIONS, MAX_PBKDF2_ITERATIONS, _pbkdf2
+    while cost < limit:
+        started = time.perf_counter()
+        kdf("0000", salt, cost)
+        # Stop once doubling the cost would overshoot the budget
+        if (time.perf_counter() - started) * 2 > target:
+            break
+        cost *= 2
+    _kdf_params = ("scrypt", cost) if kdf is _scrypt else ("pbkdf2_sha256", cost)
+    return _kdf_params
+
+
+def get_kdf_params():
+    """Return the (algorithm, cost) used for new hashes, calibrating on first use."""
+    if _kdf_params is None:
+        calibrate_kdf()
+    return _kdf_params
+
+
+@metrics.timed("pin_hash_seconds")
+def hash_pin(pin, params=None):
+    """Hash the PIN with a fresh salt and the calibrated work factor."""
+    algorithm, cost = params or get_kdf_params()
+    salt = os.urandom(SALT_BYTES)
+    if algorithm == "scrypt":
+        return f"scrypt${cost}${SCRYPT_R}${SCRYPT_P}${salt.hex()}${_scrypt(pin, salt, cost).hex()}"
+    return f"pbkdf2_sha256${cost}${salt.hex()}${_pbkdf2(pin, salt, cost).hex()}"
+
+
+def verify_pin(pin, stored):
+    """Return True if the PIN matches a stored hash of any supported format."""
+    if is_legacy_hash(stored):
+        return hmac.compare_digest(legacy_hash_pin(pin), stored)
+    parts = stored.split("$")
+    try:
+        if parts[0] == "scrypt":
+            _, n, r, p, salt, expected = parts
+            computed = hashlib.scrypt(pin.encode(), salt=bytes.fromhex(salt), n=int(n), r=int(r), p=int(p),
+                                      maxmem=256 * int(r) * (int(n) + int(p) + 2), dklen=32)
+        elif parts[0] == "pbkdf2_sha256":
+            _, iterations, salt, expected = parts
+            computed = _pbkdf2(pin, bytes.fromhex(salt), int(iterations))
+        else:
+            return False
+    except ValueError:
+        return False
+    return hmac.compare_digest(computed.hex(), expected)
+
+
+def verify_unknown_user(pin):
+    """Spend the same time as a real verification, so unknown usernames are not revealed by timing."""
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = hash_pin("0000")
+    verify_pin(pin, _dummy_hash)
+    return False
+
+
+def needs_rehash(stored):
+    """Return True if a stored hash is legacy or weaker than the current work factor."""
+    if is_legacy_hash(stored):
+        return True
+    algorithm, cost = get_kdf_params()
+    parts = stored.split("$")
+    return parts[0] != algorithm or int(parts[1]) < cost
+
+
+def hash_chunk(pins, params=None):
+    """Hash a list of PINs in one worker call."""
+    return [hash_pin(pin, params) for pin in pins]
+
+
+def chunk_size_for(count, workers):
+    """Return a chunk size that gives each worker a few chunks of the batch."""
+    return max(1, -(-count // (workers * CHUNKS_PER_WORKER)))
+
+
+def hash_pins(pins, executor=None, workers=None, chunksize=None, use_threads=False):
+    """Hash a batch of PINs in parallel and return the hashes in the same order.
+
+    Pass a long-lived executor to reuse its workers across batches; otherwise a pool is
+    created for this call only. use_threads selects a thread pool instead of processes.
+    """
+    pins = list(pins)
+    # Worker processes must use this process's calibration rather than calibrating themselves
+    worker = functools.partial(hash_chunk, params=get_kdf_params())
+    if len(pins) < PARALLEL_THRESHOLD and executor is None:
+        return worker(pins)
+
+    workers = workers or os.cpu_count() or 1
+    chunksize = chunksize or chunk_size_for(len(pins), workers)
+    chunks = [pins[start:start + chunksize] for start in range(0, len(pins), chunksize)]
+
+    owns_executor = executor is None
+    if owns_executor:
+        # Imported here so interactive programs that never hash in bulk do not load multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        executor = (ThreadPoolExecutor if use_threads else ProcessPoolExecutor)(max_workers=workers)
+    try:
+        hashes = []
+        # Executor.map yields results in submission order, so chunk order is preserved
+        for chunk_hashes in executor.map(worker, chunks):
+            hashes.extend(chunk_hashes)
+        return hashes
+    finally:
+        if owns_executor:
+            executor.shutdown()
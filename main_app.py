@@ -5,58 +5,130 @@
 # Users can create accounts, login, reset their PINs, and access a main menu with various options.
 # The program stores user data in an SQLite database and hashes PINs for security.
 
-import sys
+import time
+
+# Taken before the remaining imports so the startup timeline includes them
+STARTED_AT = time.perf_counter()
+
+# (seconds since start, event) pairs printed by --profile-startup
+startup_timeline = []
+
+
+def mark_startup(event):
+    """Record a startup milestone."""
+    startup_timeline.append((time.perf_counter() - STARTED_AT, event))
+
+
+import argparse
 import tkinter as tk
 from tkinter import ttk, messagebox
 import tkinter.font as tkFont
-import sqlite3
-import hashlib
 import os
-import webbrowser
+import sys
+
+mark_startup("tkinter imported")
+
+import config
+import metrics
+
+mark_startup("settings and metrics imported")
+
+from account_service import (ACCOUNT_TYPES, NEW_ACCOUNT_FIELDS, SECURITY_QUESTIONS, AccountError, AccountService,
+                             UsernameTakenError, account_field_errors)
+from database import setup_db, shutdown_db, start_checkpointer
+from hashing import calibrate_kdf
+
+mark_startup("account service, database and hashing imported")
 
-# Predefined security questions for account creation
-SECURITY_QUESTIONS = [
-    "-- Select --", "What is your mother's maiden name?", "What city were you born in?",
-    "What is the name of your first pet?", "What is your favorite color?",
-    "What is the name of your elementary school?"
-]
+from shutdown import ShutdownManager
+from workers import drain_workers, run_in_background, running_tasks
 
-# Predefined account types for accoeunt creation
-ACCOUNT_TYPES = ["-- Select --", "User", "Vendor"]
+mark_startup("shutdown and worker modules imported")
 
+# Shared account service used by every window
+service = AccountService()
 
-def connect_db():
-    """Connect to the SQLite database."""
-    return sqlite3.connect("accounts.db")
+# Runs the steps registered in main() when the program exits
+shutdown_manager = ShutdownManager()
 
+mark_startup("account service created")
 
-def setup_db():
-    """Set up the SQLite database."""
-    with connect_db() as conn:
-        conn.execute('''CREATE TABLE IF NOT EXISTS accounts
-                        (first_name TEXT, last_name TEXT, address_line1 TEXT, address_line2 TEXT,
-                         account_type TEXT, username TEXT, pin TEXT, security_question TEXT, security_answer TEXT)''')
 
+def print_startup_timeline():
+    """Print the startup milestones with the time each step took."""
+    print("Startup timeline:")
+    previous = 0.0
+    for elapsed, event in startup_timeline:
+        print(f"  {elapsed * 1000:8.1f} ms  (+{(elapsed - previous) * 1000:7.1f} ms)  {event}")
+        previous = elapsed
 
-def hash_pin(pin):
-    """Hash the PIN using SHA-256."""
-    return hashlib.sha256(pin.encode()).hexdigest()
+
+def show_error(error):
+    """Report a failed background operation."""
+    if isinstance(error, AccountError):
+        messagebox.showerror("Error", str(error))
+    else:
+        messagebox.showerror("Error", f"Database error: {str(error)}")
 
 
 def exit_program():
-    """Exit the program."""
-    sys.exit()
+    """Shut down cleanly; closing the windows ends the main loop and the program."""
+    shutdown_manager.shutdown()
+
 
+class App(tk.Tk):
+    """The single Tk root. Every screen is a frame swapped in and out of this window.
 
-class BaseWindow(tk.Tk):
-    """Base window class with common functionality."""
+    Screens and dialogs are built the first time they are shown and kept in a registry
+    keyed by class. Showing one again only resets its fields instead of rebuilding it.
+    """
 
-    def __init__(self, title):
+    def __init__(self):
         super().__init__()
-        self.title(title)
         self.default_font = tkFont.Font(family="Helvetica", size=12)
         self.option_add("*Font", self.default_font)
+        self.current_screen = None
+        self.session_token = None
+        self.screens = {}
+        self.dialogs = {}
+        self.protocol("WM_DELETE_WINDOW", exit_program)
+
+    def get_screen(self, screen_class):
+        """Return the cached screen of screen_class, building it on first use."""
+        screen = self.screens.get(screen_class)
+        if screen is None:
+            screen = self.screens[screen_class] = screen_class(self)
+        else:
+            screen.reset()
+        return screen
+
+    def show_screen(self, screen_class):
+        """Replace the current screen with the cached screen of screen_class."""
+        screen = self.get_screen(screen_class)
+        if self.current_screen is not None and self.current_screen is not screen:
+            self.current_screen.pack_forget()
+        self.current_screen = screen
+        self.current_screen.pack(fill="both", expand=True)
+        self.title(self.current_screen.title_text)
+        self.deiconify()
         self.center_window()
+        return self.current_screen
+
+    def show_dialog(self, dialog_class, *args):
+        """Show the cached dialog of dialog_class, building it on first use."""
+        dialog = self.dialogs.get(dialog_class)
+        if dialog is None:
+            dialog = self.dialogs[dialog_class] = dialog_class(self)
+        dialog.reset(*args)
+        dialog.deiconify()
+        return dialog
+
+    def close_windows(self):
+        """Destroy every top-level window, then the root."""
+        for child in self.winfo_children():
+            if isinstance(child, tk.Toplevel):
+                child.destroy()
+        self.destroy()
 
     def center_window(self):
         """Center the window on the screen."""
@@ -69,6 +141,19 @@ class BaseWindow(tk.Tk):
         y_coordinate = (screen_height - window_height) // 2
         self.geometry(f"+{x_coordinate}+{y_coordinate}")
 
+
+class BaseWindow(tk.Frame):
+    """Base screen class with common functionality."""
+
+    def __init__(self, app, title):
+        super().__init__(app)
+        self.app = app
+        self.title_text = title
+        self.default_font = app.default_font
+
+    def reset(self):
+        """Clear the screen's field state before it is shown again."""
+
     def add_exit_button(self):
         """Add an exit button to the window."""
         exit_button = tk.Button(self, text="Exit", command=exit_program, font=self.default_font)
@@ -76,17 +161,38 @@ class BaseWindow(tk.Tk):
 
 
 class CreateAccountWindow(BaseWindow):
-    """Window for creating a new account."""
-
-    def __init__(self, parent):
-        super().__init__("Create Account")
+    """Window for creating a new account.
+
+    Fields are validated as the user types: key events are debounced with after(), cheap checks
+    run inline and the username availability check runs on the worker pool, where a newer
+    keystroke supersedes any check still in flight.
+    """
+
+    # Form label -> AccountService field name
+    FIELD_NAMES = {
+        "First Name:": "first_name", "Last Name:": "last_name", "Address Line 1:": "address_line1",
+        "Address Line 2:": "address_line2", "Account Type:": "account_type", "Username:": "username",
+        "PIN (4 digits):": "pin", "Confirm PIN:": "confirm_pin", "Security Question:": "security_question",
+        "Security Answer:": "security_answer",
+    }
+
+    def __init__(self, app):
+        super().__init__(app, "Create Account")
         self.entries = None
-        self.parent = parent
+        self.error_labels = None
+        self.create_button = None
+        self.touched = set()
+        self.pending_validation = None
+        self.username_check = None  # future of the availability check in flight
+        self.username_generation = 0
+        self.username_status = (None, True)  # (last checked username, whether it was available)
         self.create_widgets()
 
+    @metrics.timed("create_widgets_seconds", window="CreateAccountWindow")
     def create_widgets(self):
         """Create GUI elements for account creation."""
         self.entries = {}
+        self.error_labels = {}
         labels = ["First Name:", "Last Name:", "Address Line 1:", "Address Line 2:", "Account Type:",
                   "Username:", "PIN (4 digits):", "Confirm PIN:", "Security Question:", "Security Answer:"]
         max_label_width = max(len(label) for label in labels)
@@ -97,14 +203,38 @@ class CreateAccountWindow(BaseWindow):
             entry = ttk.Entry(self, font=self.default_font, show="*" if "PIN" in label else None, width=30)
             entry.grid(row=idx, column=1, sticky="ew", padx=10, pady=5)
             self.entries[label] = entry
+            error_label = tk.Label(self, text="", fg="red", anchor="w", width=32)
+            error_label.grid(row=idx, column=2, sticky="w", padx=(0, 10))
+            self.error_labels[label] = error_label
 
         self.setup_combobox("Account Type:", 4, ACCOUNT_TYPES)
         self.setup_combobox("Security Question:", 8, SECURITY_QUESTIONS)
 
-        tk.Button(self, text="Create Account", command=self.create_account_button_click, font=self.default_font,
-                  width=20).grid(row=10, columnspan=2, padx=10, pady=10)
+        for label, widget in self.entries.items():
+            event = "<<ComboboxSelected>>" if isinstance(widget, ttk.Combobox) else "<KeyRelease>"
+            widget.bind(event, lambda _event, changed=label: self.on_field_changed(changed))
+
+        self.create_button = tk.Button(self, text="Create Account", command=self.create_account_button_click,
+                                       font=self.default_font, width=20)
+        self.create_button.grid(row=10, columnspan=2, padx=10, pady=10)
         self.add_exit_button()
 
+    def reset(self):
+        """Clear every field of the form."""
+        for label, entry in self.entries.items():
+            if isinstance(entry, ttk.Combobox):
+                entry.set("-- Select --")
+            else:
+                entry.delete(0, tk.END)
+        for error_label in self.error_labels.values():
+            error_label.config(text="")
+        self.touched.clear()
+        if self.pending_validation is not None:
+            self.after_cancel(self.pending_validation)
+            self.pending_validation = None
+        self.cancel_username_check()
+        self.username_status = (None, True)
+
     def setup_combobox(self, label, row, values):
         """Set up a combobox widget."""
         combobox = ttk.Combobox(self, values=values, width=max(len(label) for label in values), font=self.default_font,
@@ -113,53 +243,82 @@ class CreateAccountWindow(BaseWindow):
         combobox.set("-- Select --")
         self.entries[label] = combobox
 
-    def create_account_button_click(self):
-        """Handle the 'Create Account' button click."""
-        entries = self.entries
-        first_name = entries["First Name:"].get().strip()
-        last_name = entries["Last Name:"].get().strip()
-        address_line1 = entries["Address Line 1:"].get().strip()
-        address_line2 = entries["Address Line 2:"].get().strip()
-        account_type = entries["Account Type:"].get().strip()
-        username = entries["Username:"].get().strip()
-        pin = entries["PIN (4 digits):"].get().strip()
-        confirm_pin = entries["Confirm PIN:"].get().strip()
-        security_question = entries["Security Question:"].get().strip()
-        security_answer = entries["Security Answer:"].get().strip()
-
-        if not (
-                first_name and last_name and address_line1 and account_type and username and pin and confirm_pin and security_question and security_answer):
-            messagebox.showerror("Error", "Please fill in all fields.")
-            return
-
-        if not pin.isdigit() or len(pin) != 4:
-            messagebox.showerror("Error", "PIN must be a 4-digit number.")
+    def field_values(self):
+        """Return the stripped form values keyed by AccountService field name."""
+        return {self.FIELD_NAMES[label]: entry.get().strip() for label, entry in self.entries.items()}
+
+    def on_field_changed(self, label):
+        """Debounce validation: run it once typing pauses instead of on every key."""
+        self.touched.add(label)
+        if self.pending_validation is not None:
+            self.after_cancel(self.pending_validation)
+        self.pending_validation = self.after(config.VALIDATION_DEBOUNCE_MS, self.validate_fields)
+
+    def validate_fields(self, show_all=False):
+        """Show the error of every touched field (or of every field) and return the errors found."""
+        self.pending_validation = None
+        values = self.field_values()
+        errors = account_field_errors(**values)
+        username = values["username"]
+        if "username" not in errors and self.username_status == (username, False):
+            errors["username"] = "Username is already taken."
+        for label, error_label in self.error_labels.items():
+            shown = show_all or label in self.touched
+            error_label.config(text=errors.get(self.FIELD_NAMES[label], "") if shown else "")
+
+        # On submit the insert itself is the authoritative check, so only check while typing
+        if not show_all and "Username:" in self.touched and "username" not in errors \
+                and username != self.username_status[0]:
+            self.check_username(username)
+        return errors
+
+    def cancel_username_check(self):
+        """Drop the availability check in flight; its result will be ignored."""
+        self.username_generation += 1
+        if self.username_check is not None:
+            self.username_check.cancel()
+            self.username_check = None
+
+    def check_username(self, username):
+        """Ask the service whether the username is free, superseding any earlier check."""
+        self.cancel_username_check()
+        generation = self.username_generation
+        self.username_check = run_in_background(
+            self, service.username_available, (username,),
+            on_success=lambda available: self.on_username_checked(generation, username, available),
+            on_error=lambda _error: None)
+
+    def on_username_checked(self, generation, username, available):
+        """Show the availability result unless a newer check replaced it."""
+        if generation != self.username_generation:
             return
+        self.username_check = None
+        self.username_status = (username, available)
+        if self.field_values()["username"] == username:
+            self.error_labels["Username:"].config(text="" if available else "Username is already taken.")
 
-        if pin != confirm_pin:
-            messagebox.showerror("Error", "PINs do not match.")
-            return
+    def create_account_button_click(self):
+        """Handle the 'Create Account' button click."""
+        if self.validate_fields(show_all=True):
+            return  # every problem is now shown next to its field
 
-        with connect_db() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM accounts WHERE username=?", (username,))
-            if cursor.fetchone():
-                messagebox.showerror("Error", "Username already exists. Please choose another one.")
-                return
-
-        pin_hash = hash_pin(pin)
-        with connect_db() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''INSERT INTO accounts (first_name, last_name, address_line1, address_line2,
-                              account_type, username, pin, security_question, security_answer)
-                              VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                           (first_name, last_name, address_line1, address_line2, account_type, username,
-                            pin_hash, security_question, security_answer))
-            conn.commit()
+        run_in_background(self, service.create_account,
+                          tuple(self.field_values()[name] for name in NEW_ACCOUNT_FIELDS + ("confirm_pin",)),
+                          on_success=self.on_account_created, on_error=self.on_create_failed,
+                          busy=(self.create_button,))
 
+    def on_account_created(self, _result):
+        """Report the successful account insert."""
         messagebox.showinfo("Success", "Account created successfully. You can now login.")
-        self.destroy()
-        self.parent.deiconify()
+        self.app.show_screen(LoginWindow)
+
+    def on_create_failed(self, error):
+        """Show a taken username next to its field; report anything else in a dialog."""
+        if isinstance(error, UsernameTakenError):
+            self.username_status = (error.username, False)
+            self.error_labels["Username:"].config(text="Username is already taken.")
+        else:
+            show_error(error)
 
 
 def open_link_browser(link):
@@ -169,17 +328,21 @@ def open_link_browser(link):
 
 def open_link(link):
     """Open a link in the default web browser."""
+    # Imported on first use; webbrowser and its subprocess dependency slow down startup
+    import webbrowser
     webbrowser.open_new(link)
 
 
 class MainMenuWindow(BaseWindow):
     """Window for the main menu."""
 
-    def __init__(self, parent):
-        super().__init__("Main Menu")
-        self.parent = parent
+    def __init__(self, app):
+        super().__init__(app, "Main Menu")
+        self.welcome_label = None
         self.create_widgets()
+        self.reset()
 
+    @metrics.timed("create_widgets_seconds", window="MainMenuWindow")
     def create_widgets(self):
         """Create GUI elements for the main menu."""
         ttk.Button(self, text="1", command=lambda: open_link("https://www.youtube.com/watch?v=dQw4w9WgXcQ"
@@ -200,33 +363,41 @@ class MainMenuWindow(BaseWindow):
         ttk.Button(self, text="Cat2", command=lambda: open_link_browser(
             "https://drive.google.com/file/d/13zeFjUGoa59GM0acTMV8tX3t0_4FS1N9/view?usp=sharing"), style="TButton",
                    width=60).grid(row=2, column=1, padx=10, pady=10, sticky="ew")
+        self.welcome_label = tk.Label(self, font=self.default_font, anchor="w")
+        self.welcome_label.grid(row=3, column=0, padx=10, pady=10, sticky="w")
         logout_button = tk.Button(self, text="Logout", command=self.logout, font=self.default_font, width=10)
         logout_button.grid(row=3, column=1, padx=10, pady=10, sticky="se")
 
+    def reset(self):
+        """Greet the logged-in user from the session, without a database query."""
+        account = service.get_session(self.app.session_token)
+        if account:
+            self.welcome_label.config(text=f"Welcome, {account.first_name} ({account.account_type})")
+        else:
+            self.welcome_label.config(text="")
+
     def logout(self):
         """Handle the 'Logout' button click."""
-        try:
-            self.parent.deiconify()
-        except Exception as e:
-            print(f"Error: {str(e)} - Reinitializing LoginWindow.")
-            self.parent = LoginWindow()
-            self.parent.mainloop()
-        finally:
-            self.destroy()
+        service.logout(self.app.session_token)
+        self.app.session_token = None
+        self.app.show_screen(LoginWindow)
 
 
 class ResetPinWindow(tk.Toplevel):
-    """Window for resetting the PIN."""
+    """Window for resetting the PIN, shown on top of the hidden main window."""
 
-    def __init__(self, parent, username):
+    def __init__(self, parent):
         super().__init__(parent)
         self.confirm_pin_entry = None
         self.new_pin_entry = None
+        self.reset_button = None
         self.title("Reset PIN")
         self.parent = parent
-        self.username = username
+        self.username = None
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
         self.create_widgets()
 
+    @metrics.timed("create_widgets_seconds", window="ResetPinWindow")
     def create_widgets(self):
         """Create GUI elements for PIN reset."""
         tk.Label(self, text="New PIN:", font=self.parent.default_font).pack(pady=5)
@@ -237,46 +408,98 @@ class ResetPinWindow(tk.Toplevel):
         self.confirm_pin_entry = ttk.Entry(self, show="*", font=self.parent.default_font)
         self.confirm_pin_entry.pack(pady=5)
 
-        tk.Button(self, text="Reset PIN", command=self.reset_pin, font=self.parent.default_font, width=20).pack(pady=10)
+        self.reset_button = tk.Button(self, text="Reset PIN", command=self.reset_pin, font=self.parent.default_font,
+                                      width=20)
+        self.reset_button.pack(pady=10)
+
+    def reset(self, username):
+        """Prepare the window for resetting the PIN of another account."""
+        self.username = username
+        self.new_pin_entry.delete(0, tk.END)
+        self.confirm_pin_entry.delete(0, tk.END)
 
     def reset_pin(self):
         """Handle the 'Reset PIN' button click."""
         new_pin = self.new_pin_entry.get().strip()
         confirm_pin = self.confirm_pin_entry.get().strip()
 
-        if not (new_pin and confirm_pin):
-            messagebox.showerror("Error", "Please enter both new PIN and confirm PIN.")
-            return
+        run_in_background(self, service.reset_pin, (self.username, new_pin, confirm_pin),
+                          on_success=self.on_pin_reset, on_error=show_error, busy=(self.reset_button,))
 
-        if new_pin != confirm_pin:
-            messagebox.showerror("Error", "PINs do not match.")
-            return
+    def on_pin_reset(self, _result):
+        """Report the successful PIN update."""
+        messagebox.showinfo("Success", "PIN reset successfully.")
+        self.on_close()
 
-        if not new_pin.isdigit() or len(new_pin) != 4:
-            messagebox.showerror("Error", "PIN must be a 4-digit number.")
-            return
+    def on_close(self):
+        """Hide the window and bring the main window back."""
+        self.withdraw()
+        self.parent.deiconify()
 
-        # Update the PIN in the database
-        pin_hash = hash_pin(new_pin)
-        with connect_db() as conn:
-            cursor = conn.cursor()
-            cursor.execute("UPDATE accounts SET pin=? WHERE username=?", (pin_hash, self.username))
-            conn.commit()
 
-        messagebox.showinfo("Success", "PIN reset successfully.")
-        self.destroy()
+class SecurityQuestionWindow(tk.Toplevel):
+    """Window asking the security question before a PIN reset, shown on top of the hidden main window."""
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.question_label = None
+        self.answer_entry = None
+        self.submit_button = None
+        self.title("Security Question")
+        self.parent = parent
+        self.username = None
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.create_widgets()
+
+    @metrics.timed("create_widgets_seconds", window="SecurityQuestionWindow")
+    def create_widgets(self):
+        """Create GUI elements for answering the security question."""
+        self.question_label = tk.Label(self, font=self.parent.default_font)
+        self.question_label.pack(pady=10)
+        self.answer_entry = ttk.Entry(self, font=self.parent.default_font)
+        self.answer_entry.pack(pady=5)
+        self.submit_button = tk.Button(self, text="Submit", command=self.submit_answer, font=self.parent.default_font)
+        self.submit_button.pack(pady=5)
+
+    def reset(self, username, security_question):
+        """Prepare the window for the security question of another account."""
+        self.username = username
+        self.question_label.config(text=security_question)
+        self.answer_entry.delete(0, tk.END)
+
+    def submit_answer(self):
+        """Submit the security answer."""
+        run_in_background(self, service.verify_security_answer, (self.username, self.answer_entry.get()),
+                          on_success=self.on_answer_checked, on_error=show_error, busy=(self.submit_button,))
+
+    def on_answer_checked(self, correct):
+        """Open the PIN reset window if the security answer was correct."""
+        if correct:
+            messagebox.showinfo("Success", "Security answer correct. You can now reset your PIN.")
+            self.withdraw()
+            self.parent.show_dialog(ResetPinWindow, self.username)
+        else:
+            messagebox.showerror("Error", "Incorrect answer to security question.")
+
+    def on_close(self):
+        """Hide the window and bring the main window back."""
+        self.withdraw()
         self.parent.deiconify()
 
 
 class LoginWindow(BaseWindow):
     """Window for user login."""
 
-    def __init__(self):
-        super().__init__("Login")
+    def __init__(self, app):
+        super().__init__(app, "Login")
         self.pin_entry = None
         self.username_entry = None
+        self.login_button = None
+        self.create_account_button = None
+        self.forgot_pin_button = None
         self.create_widgets()
 
+    @metrics.timed("create_widgets_seconds", window="LoginWindow")
     def create_widgets(self):
         """Create GUI elements for login."""
         tk.Label(self, text="Username:", font=self.default_font).grid(row=0, column=0, padx=10, pady=5)
@@ -285,107 +508,143 @@ class LoginWindow(BaseWindow):
         tk.Label(self, text="PIN:", font=self.default_font).grid(row=1, column=0, padx=10, pady=5)
         self.pin_entry = ttk.Entry(self, show="*", font=self.default_font, width=30)
         self.pin_entry.grid(row=1, column=1, padx=10, pady=5)
-        tk.Button(self, text="Login", command=self.login, font=self.default_font, width=20).grid(row=2, columnspan=2,
-                                                                                                 padx=10, pady=10)
-        tk.Button(self, text="Create Account", command=self.open_create_account_window, font=self.default_font,
-                  width=20).grid(row=3, columnspan=2, padx=10, pady=10)
-        tk.Button(self, text="Forgot PIN?", command=self.forgot_pin, font=self.default_font, width=20).grid(row=4,
-                                                                                                            columnspan=2,
-                                                                                                            padx=10,
-                                                                                                            pady=10)
+        self.login_button = tk.Button(self, text="Login", command=self.login, font=self.default_font, width=20)
+        self.login_button.grid(row=2, columnspan=2, padx=10, pady=10)
+        self.create_account_button = tk.Button(self, text="Create Account", command=self.open_create_account_window,
+                                               font=self.default_font, width=20)
+        self.create_account_button.grid(row=3, columnspan=2, padx=10, pady=10)
+        self.forgot_pin_button = tk.Button(self, text="Forgot PIN?", command=self.forgot_pin, font=self.default_font,
+                                           width=20)
+        self.forgot_pin_button.grid(row=4, columnspan=2, padx=10, pady=10)
         self.add_exit_button()
 
+    def reset(self):
+        """Clear the username and PIN fields."""
+        self.username_entry.delete(0, tk.END)
+        self.pin_entry.delete(0, tk.END)
+
+    def database_buttons(self):
+        """Return the buttons that need the database, kept disabled until it is ready."""
+        return self.login_button, self.create_account_button, self.forgot_pin_button
+
     def login(self):
         """Handle the 'Login' button click."""
         username = self.username_entry.get().strip()
         pin = self.pin_entry.get().strip()
 
-        if not (username and pin):
-            messagebox.showerror("Error", "Please enter both username and PIN.")
-            return
-
-        with connect_db() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM accounts WHERE username=? AND pin=?", (username, hash_pin(pin)))
-            account = cursor.fetchone()
+        run_in_background(self, service.login, (username, pin), on_success=self.on_login_result,
+                          on_error=show_error, busy=(self.login_button,))
 
-        if account:
+    def on_login_result(self, session):
+        """Open the main menu if the credentials matched an account."""
+        if session:
+            self.app.session_token, _account = session
             messagebox.showinfo("Success", "Login successful!")
-            self.withdraw()
-            main_menu = MainMenuWindow(self)
-            main_menu.mainloop()
+            self.app.show_screen(MainMenuWindow)
         else:
             messagebox.showerror("Error", "Invalid username or PIN.")
 
     def open_create_account_window(self):
-        """Open the 'Create Account' window."""
-        self.withdraw()
-        create_account_window = CreateAccountWindow(self)
-        create_account_window.mainloop()
+        """Open the 'Create Account' screen."""
+        self.app.show_screen(CreateAccountWindow)
 
     def forgot_pin(self):
         """Handle the 'Forgot PIN?' button click."""
         # Retrieve username from entry widget
         username = self.username_entry.get().strip()
 
-        if not username:
-            messagebox.showerror("Error", "Please enter your username.")
-            return
-
         # Query the database to get security question
-        with connect_db() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT security_question FROM accounts WHERE username=?", (username,))
-            result = cursor.fetchone()
+        run_in_background(self, service.get_security_question, (username,),
+                          on_success=lambda question: self.show_security_question(username, question),
+                          on_error=show_error, busy=(self.forgot_pin_button,))
 
-        if not result:
+    def show_security_question(self, username, security_question):
+        """Ask the security question of the account."""
+        if not security_question:
             messagebox.showerror("Error", "Username not found.")
             return
 
-        security_question = result[0]
-
-        # Create a new window to display security question and get answer
-        self.withdraw()  # Hide the login window
-
-        security_window = tk.Toplevel()
-        security_window.title("Security Question")
-        security_window.protocol("WM_DELETE_WINDOW",
-                                 lambda: self.on_close_security(security_window))  # Handle window close event
+        self.app.withdraw()  # Hide the login window
+        self.app.show_dialog(SecurityQuestionWindow, username, security_question)
 
-        tk.Label(security_window, text=security_question, font=self.default_font).pack(pady=10)
 
-        answer_entry = ttk.Entry(security_window, font=self.default_font)
-        answer_entry.pack(pady=5)
-
-        submit_button = tk.Button(security_window, text="Submit",
-                                  command=lambda: self.submit_answer(username, answer_entry.get(), security_window),
-                                  font=self.default_font)
-        submit_button.pack(pady=5)
-
-    def submit_answer(self, username, answer, window):
-        """Submit the security answer."""
-        # Retrieve stored security answer
-        with connect_db() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT security_answer FROM accounts WHERE username=?", (username,))
-            correct_answer = cursor.fetchone()[0]
-
-        if answer == correct_answer:
-            # Security answer is correct, allow PIN reset
-            messagebox.showinfo("Success", "Security answer correct. You can now reset your PIN.")
-            window.destroy()  # Close the security question window
-            reset_pin_window = ResetPinWindow(self, username)
-            reset_pin_window.mainloop()
-        else:
-            messagebox.showerror("Error", "Incorrect answer to security question.")
-
-    def on_close_security(self, window):
-        """Handle the close event of the security question window."""
-        self.deiconify()
-        window.destroy()
+def initialize():
+    """Bring the database schema up to date and load the state the windows depend on."""
+    setup_db()
+    start_checkpointer()
+    metrics.start_exporter()
+    mark_startup("database ready")
+    calibrate_kdf()
+    mark_startup("PIN hashing calibrated")
+    service.username_filter.ensure_loaded()
+    service.limiter.load()
+    service.limiter.start_persistence()
+    mark_startup("username filter and throttle state loaded")
+
+
+def on_initialized(_result=None, profile=False):
+    """Finish startup once initialization is complete."""
+    mark_startup("ready")
+    if profile:
+        print_startup_timeline()
+
+
+def on_initialize_failed(error):
+    """Report that the program cannot start and exit."""
+    show_error(error)
+    exit_program()
+
+
+def close_database(_remaining):
+    """Checkpoint and close the database, unless abandoned background tasks may still be using it."""
+    if running_tasks():
+        print("Error: leaving the database open for background tasks that are still running")
+        return False
+    shutdown_db()
+
+
+def register_shutdown_steps(app):
+    """Register what exit_program does, in order, each step bounded by the shutdown deadline."""
+    shutdown_manager.add_step("drain background tasks", drain_workers)
+    shutdown_manager.add_step("flush queued writes and save state", service.close)
+    shutdown_manager.add_step("stop metrics exporter", lambda _remaining: metrics.stop_exporter())
+    shutdown_manager.add_step("checkpoint and close the database", close_database)
+    shutdown_manager.add_step("destroy windows", lambda _remaining: app.close_windows())
+
+
+def main():
+    """Start the GUI.
+
+    In fast-start mode the login window is drawn first and the database is set up on a
+    worker thread, with the buttons that need it disabled until it is ready.
+    """
+    parser = argparse.ArgumentParser(description="Account management system.")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="print a timeline of imports and initialization "
+                             "(for a per-module import breakdown, run with python -X importtime)")
+    parser.add_argument("--no-fast-start", dest="fast_start", action="store_false", default=config.FAST_START,
+                        help="set up the database before drawing the first window")
+    args = parser.parse_args()
+
+    if not args.fast_start:
+        initialize()
+    app = App()
+    register_shutdown_steps(app)
+    mark_startup("Tk initialized")
+    login_window = app.show_screen(LoginWindow)
+    app.update_idletasks()
+    mark_startup("login window drawn")
+    if args.fast_start:
+        run_in_background(app, initialize, on_success=lambda result: on_initialized(result, args.profile_startup),
+                          on_error=on_initialize_failed, busy=login_window.database_buttons())
+    else:
+        on_initialized(profile=args.profile_startup)
+    app.mainloop()
+    if running_tasks():
+        # The interpreter would join the abandoned worker threads at exit and overrun the deadline
+        sys.stdout.flush()
+        os._exit(1)
 
 
 if __name__ == "__main__":
-    setup_db()
-    app = LoginWindow()
-    app.mainloop()
+    main()
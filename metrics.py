@@ -0,0 +1,210 @@
+# Description: Lightweight timing instrumentation with Prometheus text export.
+# Instrumented operations (pool checkouts, SQL statements, PIN hashing, window construction) record a
+# count and a latency histogram per label set. Recording is off unless ACCOUNTS_METRICS is set or
+# enable() is called; while off, each instrumented call costs one flag check. Snapshots are rendered
+# in the Prometheus text format, served at GET /metrics by server.py or written to a file that a
+# node_exporter textfile collector can pick up.
+
+import functools
+import os
+import re
+import threading
+import time
+
+import config
+
+# Histogram bucket upper bounds, in seconds
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+HELP = {
+    "db_connect_seconds": "Time to check a connection out of the pool.",
+    "sql_statement_seconds": "Time to execute one SQL statement.",
+    "pin_hash_seconds": "Time to hash one PIN.",
+    "create_widgets_seconds": "Time to build the widgets of a window.",
+}
+
+_enabled = config.METRICS_ENABLED
+_histograms = {}  # (name, sorted label items) -> Histogram
+_lock = threading.Lock()
+
+
+class Histogram:
+    """Cumulative latency histogram of one metric and label set."""
+
+    __slots__ = ("counts", "count", "total")
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds):
+        """Record one duration."""
+        for index, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.counts[index] += 1
+                break
+        self.count += 1
+        self.total += seconds
+
+
+def enable(on=True):
+    """Turn recording on or off."""
+    global _enabled
+    _enabled = on
+
+
+def is_enabled():
+    """Return True if measurements are being recorded."""
+    return _enabled
+
+
+def reset():
+    """Drop every recorded measurement."""
+    with _lock:
+        _histograms.clear()
+
+
+def observe(name, seconds, **labels):
+    """Record a duration for a metric and label set."""
+    if not _enabled:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram()
+        histogram.observe(seconds)
+
+
+class timer:
+    """Context manager recording the duration of its block."""
+
+    __slots__ = ("name", "labels", "started")
+
+    def __init__(self, name, **labels):
+        self.name = name
+        self.labels = labels
+        self.started = None
+
+    def __enter__(self):
+        if _enabled:
+            self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.started is not None:
+            observe(self.name, time.perf_counter() - self.started, **self.labels)
+        return False
+
+
+def timed(name, **labels):
+    """Decorator recording the duration of every call of a function."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                observe(name, time.perf_counter() - started, **labels)
+        return wrapper
+    return decorate
+
+
+_STATEMENT_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE)\s+(\w+)", re.IGNORECASE)
+
+
+def statement_label(sql):
+    """Return a low-cardinality label for a SQL statement, such as "select accounts"."""
+    words = sql.split(None, 1)
+    if not words:
+        return "empty"
+    verb = words[0].lower()
+    match = _STATEMENT_TABLE.search(sql) if verb in ("select", "insert", "update", "delete") else None
+    return f"{verb} {match.group(1)}" if match else verb
+
+
+def _format_labels(labels, **extra):
+    items = list(labels) + list(extra.items())
+    if not items:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in items)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(items, escaped)) + "}"
+
+
+def render():
+    """Return every recorded metric in the Prometheus text exposition format."""
+    with _lock:
+        snapshot = [(name, labels, list(h.counts), h.count, h.total) for (name, labels), h in _histograms.items()]
+    snapshot.sort(key=lambda item: (item[0], item[1]))
+    lines = []
+    previous_name = None
+    for name, labels, counts, count, total in snapshot:
+        if name != previous_name:
+            lines.append(f"# HELP {name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+            previous_name = name
+        cumulative = 0
+        for bound, bucket_count in zip(BUCKETS, counts):
+            cumulative += bucket_count
+            lines.append(f"{name}_bucket{_format_labels(labels, le=bound)} {cumulative}")
+        lines.append(f'{name}_bucket{_format_labels(labels, le="+Inf")} {count}')
+        lines.append(f"{name}_sum{_format_labels(labels)} {total:.6f}")
+        lines.append(f"{name}_count{_format_labels(labels)} {count}")
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def write_textfile(path=None):
+    """Write the metrics to a file atomically, for a textfile collector."""
+    path = path or config.METRICS_FILE
+    temp_path = f"{path}.tmp"
+    try:
+        with open(temp_path, "w") as file:
+            file.write(render())
+        os.replace(temp_path, path)
+    except OSError as e:
+        print(f"Error: could not write metrics - {str(e)}")
+
+
+class MetricsExporter(threading.Thread):
+    """Background thread that rewrites the metrics file at a fixed interval."""
+
+    def __init__(self, path=None, interval=None):
+        super().__init__(name="metrics-exporter", daemon=True)
+        self.path = path or config.METRICS_FILE
+        self.interval = config.METRICS_EXPORT_INTERVAL if interval is None else interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            write_textfile(self.path)
+
+    def stop(self):
+        """Stop the thread and write the file one last time."""
+        self._stop_event.set()
+        write_textfile(self.path)
+
+
+_exporter = None
+
+
+def start_exporter():
+    """Start writing the metrics file in the background, if recording and a file are configured."""
+    global _exporter
+    if not (_enabled and config.METRICS_FILE) or config.METRICS_EXPORT_INTERVAL <= 0:
+        return None
+    if _exporter is None or not _exporter.is_alive():
+        _exporter = MetricsExporter()
+        _exporter.start()
+    return _exporter
+
+
+def stop_exporter():
+    """Stop the background exporter."""
+    global _exporter
+    if _exporter is not None:
+        _exporter.stop()
+        _exporter = None
@@ -0,0 +1,131 @@
+# Description: Versioned schema migrations for the accounts database.
+# The schema version is stored in SQLite's user_version PRAGMA. Each migration moves the
+# database forward by one version and is written so it can run against a live database:
+# bulk work happens in short batches and only the final swap holds the write lock.
+
+import sqlite3
+
+# Rows copied per transaction while rebuilding a table
+COPY_BATCH_SIZE = 5000
+
+# Data columns of the accounts table, in the order create_account() and insert_account take them
+ACCOUNT_COLUMNS = ("first_name", "last_name", "address_line1", "address_line2", "account_type",
+                   "username", "pin", "security_question", "security_answer")
+
+
+def get_version(conn):
+    """Return the schema version of the database."""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def set_version(conn, version):
+    """Record the schema version of the database."""
+    conn.execute(f"PRAGMA user_version={int(version)}")
+
+
+def add_primary_key_and_unique_username(conn):
+    """Rebuild accounts with an INTEGER PRIMARY KEY and a UNIQUE index on username.
+
+    Rows are copied into a new table in small batches so readers and writers are only
+    blocked for a moment at a time. Duplicate usernames keep their oldest row; the newer
+    rows are moved to accounts_duplicates for review. Triggers mirror updates and deletes of
+    already copied rows, and rows inserted during the copy are picked up by the final
+    catch-up inside the swap transaction.
+    """
+    columns = ", ".join(ACCOUNT_COLUMNS)
+    for table in ("accounts_new", "accounts_duplicates"):
+        conn.execute(f'''CREATE TABLE IF NOT EXISTS {table}
+                         (id INTEGER PRIMARY KEY, first_name TEXT, last_name TEXT, address_line1 TEXT,
+                          address_line2 TEXT, account_type TEXT, username TEXT, pin TEXT, security_question TEXT,
+                          security_answer TEXT)''')
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS accounts_username ON accounts_new (username)")
+    assignments = ", ".join(f"{column}=NEW.{column}" for column in ACCOUNT_COLUMNS)
+    conn.execute(f'''CREATE TRIGGER IF NOT EXISTS accounts_migrate_update AFTER UPDATE ON accounts
+                     BEGIN UPDATE OR IGNORE accounts_new SET {assignments} WHERE id=OLD.rowid; END''')
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS accounts_migrate_delete AFTER DELETE ON accounts
+                    BEGIN DELETE FROM accounts_new WHERE id=OLD.rowid; END''')
+
+    copy_sql = f'''INSERT OR IGNORE INTO accounts_new (id, {columns})
+                   SELECT rowid, {columns} FROM accounts WHERE rowid > ? AND rowid <= ? ORDER BY rowid'''
+    # Rows of the same range that were not copied lost to an older row with the same username
+    set_aside_sql = f'''INSERT OR IGNORE INTO accounts_duplicates (id, {columns})
+                        SELECT rowid, {columns} FROM accounts WHERE rowid > ? AND rowid <= ?
+                        AND rowid NOT IN (SELECT id FROM accounts_new WHERE id > ? AND id <= ?)'''
+
+    def copy_range(first, last):
+        conn.execute(copy_sql, (first, last))
+        conn.execute(set_aside_sql, (first, last, first, last))
+
+    # Resume after the last copied or set aside row if a previous run was interrupted
+    last_rowid = conn.execute("SELECT MAX(COALESCE((SELECT MAX(id) FROM accounts_new), 0), "
+                              "COALESCE((SELECT MAX(id) FROM accounts_duplicates), 0))").fetchone()[0]
+    while True:
+        conn.execute("BEGIN IMMEDIATE")
+        batch_end = conn.execute("SELECT MAX(rowid) FROM (SELECT rowid FROM accounts WHERE rowid > ? "
+                                 "ORDER BY rowid LIMIT ?)", (last_rowid, COPY_BATCH_SIZE)).fetchone()[0]
+        if batch_end is None:
+            conn.execute("COMMIT")
+            break
+        copy_range(last_rowid, batch_end)
+        conn.execute("COMMIT")
+        last_rowid = batch_end
+
+    # Short final transaction: catch up on new rows and swap the tables
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if get_version(conn) >= 1:
+            conn.execute("ROLLBACK")
+            return
+        end = conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM accounts").fetchone()[0]
+        copy_range(last_rowid, end)
+        conn.execute("DROP TABLE accounts")
+        conn.execute("ALTER TABLE accounts_new RENAME TO accounts")
+        set_version(conn, 1)
+        conn.execute("COMMIT")
+    except sqlite3.Error:
+        conn.execute("ROLLBACK")
+        raise
+    duplicates = conn.execute("SELECT COUNT(*) FROM accounts_duplicates").fetchone()[0]
+    if duplicates:
+        print(f"Moved {duplicates} accounts with an already taken username to the accounts_duplicates table")
+    else:
+        conn.execute("DROP TABLE accounts_duplicates")
+
+
+def add_login_covering_index(conn):
+    """Add an index on (username, pin) so the login lookup is answered from the index alone.
+
+    Building the index holds the write lock for its duration (about a second per million rows);
+    readers are not blocked under WAL.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("CREATE INDEX IF NOT EXISTS accounts_username_pin ON accounts (username, pin)")
+        set_version(conn, 2)
+        conn.execute("COMMIT")
+    except sqlite3.Error:
+        conn.execute("ROLLBACK")
+        raise
+
+
+# Ordered list of (version, description, migration function)
+MIGRATIONS = [
+    (1, "Add INTEGER PRIMARY KEY and UNIQUE index on accounts.username", add_primary_key_and_unique_username),
+    (2, "Add covering index on accounts (username, pin) for logins", add_login_covering_index),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def migrate(conn):
+    """Apply every pending migration to the database."""
+    isolation_level = conn.isolation_level
+    conn.commit()
+    conn.isolation_level = None  # migrations manage their own transactions
+    try:
+        for version, _description, migration in MIGRATIONS:
+            if get_version(conn) < version:
+                migration(conn)
+    finally:
+        conn.isolation_level = isolation_level
+    return get_version(conn)
@@ -0,0 +1,73 @@
+# Description: Registry of the named SQL statements used by the account service.
+# Hot statements live here under fixed names, so every call sends sqlite3 the identical SQL string and
+# its per-connection statement cache (sized by config.STATEMENT_CACHE_SIZE) prepares each one once per
+# pooled connection. Per-query counters record how often a statement was served from that cache.
+
+import threading
+
+from migrations import ACCOUNT_COLUMNS
+
+# Columns returned for an authenticated account; the PIN hash and security answer never leave the service
+ACCOUNT_FIELDS = ("first_name", "last_name", "address_line1", "address_line2", "account_type", "username",
+                  "security_question")
+
+QUERIES = {
+    # Answered from the (username, pin) index alone; SQLite would otherwise pick the unique username
+    # index and read the table row for the PIN hash
+    "authenticate": "SELECT id, pin FROM accounts INDEXED BY accounts_username_pin WHERE username=?",
+    "account_by_id": f"SELECT {', '.join(ACCOUNT_FIELDS)} FROM accounts WHERE id=?",
+    "username_exists": "SELECT 1 FROM accounts WHERE username=?",
+    "insert_account": f"INSERT INTO accounts ({', '.join(ACCOUNT_COLUMNS)}) "
+                      f"VALUES ({', '.join('?' for _ in ACCOUNT_COLUMNS)})",
+    "update_pin": "UPDATE accounts SET pin=? WHERE username=?",
+    "upgrade_pin": "UPDATE accounts SET pin=? WHERE username=? AND pin=?",
+    "get_recovery": "SELECT security_question, security_answer FROM accounts WHERE username=?",
+}
+
+
+class QueryStats:
+    """Per-query counters of executions served by, or missing, the statement cache."""
+
+    def __init__(self):
+        self.hits = dict.fromkeys(QUERIES, 0)
+        self.misses = dict.fromkeys(QUERIES, 0)
+        self._lock = threading.Lock()
+
+    def record(self, name, hit):
+        """Count one execution of a query."""
+        with self._lock:
+            (self.hits if hit else self.misses)[name] += 1
+
+    def as_dict(self):
+        """Return the counters of every query that has run, as a dictionary."""
+        with self._lock:
+            return {name: {"hits": self.hits[name], "misses": self.misses[name]}
+                    for name in QUERIES if self.hits[name] or self.misses[name]}
+
+
+stats = QueryStats()
+
+
+def _record_execution(conn, name):
+    """Count an execution as a hit if the connection has prepared the query before."""
+    prepared = getattr(conn, "prepared_queries", None)
+    hit = prepared is not None and name in prepared
+    if prepared is not None and not hit:
+        prepared.add(name)
+    stats.record(name, hit)
+
+
+def execute(conn, name, parameters=()):
+    """Execute a registered query on a connection and return the cursor.
+
+    Pooled connections remember which queries they have prepared; the first execution on a
+    connection is counted as a miss and later ones as hits. Other connections always count a miss.
+    """
+    _record_execution(conn, name)
+    return conn.execute(QUERIES[name], parameters)
+
+
+def executemany(conn, name, seq_of_parameters):
+    """Execute a registered query once per parameter set and return the cursor."""
+    _record_execution(conn, name)
+    return conn.executemany(QUERIES[name], seq_of_parameters)
@@ -0,0 +1,273 @@
+# Description: Asyncio HTTP/JSON front end for the account operations.
+# Serves the login, create-account and forgot-PIN flows of AccountService to many clients at once.
+# The event loop only parses HTTP; database and hashing work runs on a bounded thread pool, and a
+# semaphore caps the number of requests being processed so overload turns into fast 503 responses
+# instead of an unbounded backlog.
+#
+# Usage: python server.py [--host HOST] [--port PORT] [--workers N] [--max-concurrency N] [--metrics]
+
+import argparse
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+import config
+import database
+import hashing
+import metrics
+from account_service import NEW_ACCOUNT_FIELDS, AccountService, ThrottledError, UsernameTakenError, ValidationError
+from writebehind import WriteQueueFullError
+
+# Largest request body accepted, in bytes
+MAX_BODY_SIZE = 64 * 1024
+
+
+class HttpError(Exception):
+    """Raised by a handler to answer with an error status."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def require_fields(data, *names):
+    """Return the named string fields of a JSON body, rejecting missing or non-string values."""
+    values = []
+    for name in names:
+        value = data.get(name, "")
+        if not isinstance(value, str):
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"Field '{name}' must be a string.")
+        values.append(value.strip())
+    return values
+
+
+class AccountServer:
+    """HTTP server exposing AccountService as JSON endpoints."""
+
+    def __init__(self, service=None, workers=None, max_concurrency=None):
+        self.service = service or AccountService()
+        self.executor = ThreadPoolExecutor(max_workers=workers or config.SERVER_WORKERS,
+                                           thread_name_prefix="server-db")
+        self.limit = asyncio.Semaphore(max_concurrency or config.SERVER_MAX_CONCURRENCY)
+        self.routes = {
+            ("GET", "/health"): self.health,
+            ("GET", "/metrics"): self.metrics,
+            ("POST", "/login"): self.login,
+            ("POST", "/logout"): self.logout,
+            ("POST", "/session"): self.session,
+            ("POST", "/accounts"): self.create_account,
+            ("POST", "/username-available"): self.username_available,
+            ("POST", "/forgot-pin"): self.forgot_pin,
+            ("POST", "/verify-answer"): self.verify_answer,
+            ("POST", "/reset-pin"): self.reset_pin,
+        }
+
+    async def run_blocking(self, func, *args):
+        """Run a blocking service call on the database thread pool."""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def health(self, _data, _peer):
+        """Report that the server is up."""
+        return HTTPStatus.OK, {"status": "ok"}
+
+    async def metrics(self, _data, _peer):
+        """Return the timing metrics and throttling counters in the Prometheus text format."""
+        if not metrics.is_enabled():
+            raise HttpError(HTTPStatus.NOT_FOUND, "Metrics are disabled.")
+        return HTTPStatus.OK, metrics.render() + self.service.limiter.stats.render()
+
+    async def login(self, data, peer):
+        """Authenticate a username and PIN."""
+        username, pin = require_fields(data, "username", "pin")
+        session = await self.run_blocking(self.service.login, username, pin, peer)
+        if session is None:
+            raise HttpError(HTTPStatus.UNAUTHORIZED, "Invalid username or PIN.")
+        token, account = session
+        return HTTPStatus.OK, {"token": token, "account": account._asdict()}
+
+    async def logout(self, data, _peer):
+        """End a session."""
+        token, = require_fields(data, "token")
+        return HTTPStatus.OK, {"logged_out": self.service.logout(token)}
+
+    async def session(self, data, _peer):
+        """Return the account of a live session; answered from memory."""
+        token, = require_fields(data, "token")
+        account = self.service.get_session(token)
+        if account is None:
+            raise HttpError(HTTPStatus.UNAUTHORIZED, "Session expired or unknown.")
+        return HTTPStatus.OK, {"account": account._asdict()}
+
+    async def create_account(self, data, _peer):
+        """Create a new account."""
+        fields = require_fields(data, *NEW_ACCOUNT_FIELDS)
+        await self.run_blocking(self.service.create_account, *fields)
+        return HTTPStatus.CREATED, {"username": fields[NEW_ACCOUNT_FIELDS.index("username")]}
+
+    async def username_available(self, data, _peer):
+        """Report whether a username is free."""
+        username, = require_fields(data, "username")
+        available = await self.run_blocking(self.service.username_available, username)
+        return HTTPStatus.OK, {"username": username, "available": available}
+
+    async def forgot_pin(self, data, _peer):
+        """Return the security question of an account."""
+        username, = require_fields(data, "username")
+        question = await self.run_blocking(self.service.get_security_question, username)
+        if question is None:
+            raise HttpError(HTTPStatus.NOT_FOUND, "Username not found.")
+        return HTTPStatus.OK, {"security_question": question}
+
+    async def verify_answer(self, data, peer):
+        """Check an answer to the security question."""
+        username, answer = require_fields(data, "username", "answer")
+        correct = await self.run_blocking(self.service.verify_security_answer, username, answer, peer)
+        return HTTPStatus.OK, {"correct": correct}
+
+    async def reset_pin(self, data, peer):
+        """Replace the PIN after checking the security answer."""
+        # The security answer is checked again here because HTTP requests carry no state between calls
+        username, answer, new_pin, confirm_pin = require_fields(data, "username", "answer", "new_pin",
+                                                                "confirm_pin")
+        if not await self.run_blocking(self.service.verify_security_answer, username, answer, peer):
+            raise HttpError(HTTPStatus.FORBIDDEN, "Incorrect answer to security question.")
+        await self.run_blocking(self.service.reset_pin, username, new_pin, confirm_pin or new_pin)
+        return HTTPStatus.OK, {"username": username}
+
+    async def dispatch(self, method, path, body, peer):
+        """Route one request and turn exceptions into (status, payload) pairs."""
+        handler = self.routes.get((method, path))
+        if handler is None:
+            if any(route_path == path for _, route_path in self.routes):
+                return HTTPStatus.METHOD_NOT_ALLOWED, {"error": "Method not allowed."}
+            return HTTPStatus.NOT_FOUND, {"error": "Not found."}
+        try:
+            data = json.loads(body) if body else {}
+            if not isinstance(data, dict):
+                raise ValueError
+        except ValueError:
+            return HTTPStatus.BAD_REQUEST, {"error": "Request body must be a JSON object."}
+
+        try:
+            await asyncio.wait_for(self.limit.acquire(), config.SERVER_QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            return HTTPStatus.SERVICE_UNAVAILABLE, {"error": "Server is busy. Try again later."}
+        try:
+            return await handler(data, peer)
+        except HttpError as e:
+            return e.status, {"error": str(e)}
+        except ThrottledError as e:
+            return HTTPStatus.TOO_MANY_REQUESTS, {"error": str(e), "retry_after": round(e.retry_after)}
+        except UsernameTakenError as e:
+            return HTTPStatus.CONFLICT, {"error": str(e)}
+        except ValidationError as e:
+            return HTTPStatus.BAD_REQUEST, {"error": str(e)}
+        except (database.PoolTimeoutError, WriteQueueFullError):
+            return HTTPStatus.SERVICE_UNAVAILABLE, {"error": "Server is busy. Try again later."}
+        except Exception as e:
+            print(f"Error: {method} {path} failed - {str(e)}")
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Internal server error."}
+        finally:
+            self.limit.release()
+
+    async def handle_connection(self, reader, writer):
+        """Serve HTTP/1.1 requests on one connection until it closes."""
+        peer = writer.get_extra_info("peername")
+        peer = peer[0] if peer else "unknown"
+        try:
+            while True:
+                request_line = await asyncio.wait_for(reader.readline(), config.SERVER_KEEPALIVE_TIMEOUT)
+                if not request_line:
+                    break
+                method, path, version = request_line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length", 0))
+                if length > MAX_BODY_SIZE:
+                    self.write_response(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                                        {"error": "Request body too large."}, False)
+                    await writer.drain()
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                status, payload = await self.dispatch(method, path.split("?", 1)[0], body, peer)
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                self.write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass  # idle, truncated or malformed connection: just close it
+        finally:
+            writer.close()
+
+    @staticmethod
+    def write_response(writer, status, payload, keep_alive):
+        """Write a JSON response, or a plain text one if the payload is a string."""
+        if isinstance(payload, str):
+            body, content_type = payload.encode(), "text/plain; version=0.0.4"
+        else:
+            body, content_type = json.dumps(payload).encode(), "application/json"
+        headers = (f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                   f"Content-Type: {content_type}\r\n"
+                   f"Content-Length: {len(body)}\r\n"
+                   f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(headers.encode("latin-1") + body)
+
+    async def serve(self, host, port):
+        """Accept connections until cancelled."""
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"Serving on {', '.join(str(sock.getsockname()) for sock in server.sockets)}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.executor.shutdown(wait=True)
+
+
+def main():
+    """Run the account server from the command line."""
+    parser = argparse.ArgumentParser(description="Serve account operations over HTTP/JSON.")
+    parser.add_argument("--host", default=config.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=config.SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=config.SERVER_WORKERS,
+                        help="threads running database and hashing work")
+    parser.add_argument("--max-concurrency", type=int, default=config.SERVER_MAX_CONCURRENCY,
+                        help="requests processed at the same time; the rest wait or get 503")
+    parser.add_argument("--metrics", action="store_true", default=config.METRICS_ENABLED,
+                        help="record timings and serve them at GET /metrics")
+    args = parser.parse_args()
+
+    # Enabled before the pool opens its first connection, so SQL statements are timed too
+    metrics.enable(args.metrics)
+
+    # One pooled connection per worker thread so no thread waits on the pool
+    database.configure_pool(size=args.workers)
+    database.setup_db()
+    database.start_checkpointer()
+    metrics.start_exporter()
+    hashing.calibrate_kdf()
+    server = AccountServer(workers=args.workers, max_concurrency=args.max_concurrency)
+    server.service.username_filter.ensure_loaded()
+    server.service.limiter.load()
+    server.service.limiter.start_persistence()
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.service.close()
+        metrics.stop_exporter()
+        database.stop_checkpointer()
+        database.close_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# Description: In-memory store of authenticated sessions.
+# A successful login issues an opaque token mapped to a compact record of the account, so later
+# authenticated actions (such as drawing the main menu) read from memory instead of the database.
+# Sessions expire after a period of inactivity and the store is bounded by entry count and memory.
+# An index of each user's tokens lets a PIN change end their sessions without scanning the store.
+
+import secrets
+import threading
+from collections import namedtuple
+
+import config
+from cache import TTLCache
+
+# The account fields kept for a logged-in user
+SessionAccount = namedtuple("SessionAccount", ("username", "first_name", "last_name", "account_type"))
+
+
+class SessionStore:
+    """Issue, look up and invalidate session tokens."""
+
+    def __init__(self, ttl=None, max_entries=None, max_bytes=None):
+        self.cache = TTLCache(max_entries or config.SESSION_MAX_ENTRIES,
+                              config.SESSION_TTL if ttl is None else ttl,
+                              max_bytes=max_bytes or config.SESSION_MAX_BYTES, sliding=True,
+                              on_remove=self._forget)
+        self.tokens_by_user = {}  # username -> set of live tokens
+        self._lock = threading.Lock()
+
+    def _forget(self, token, account):
+        """Drop a token that left the cache (ended, expired or evicted) from the index."""
+        with self._lock:
+            tokens = self.tokens_by_user.get(account.username)
+            if tokens is not None:
+                tokens.discard(token)
+                if not tokens:
+                    del self.tokens_by_user[account.username]
+
+    def issue(self, account):
+        """Create a session for an authenticated account dict and return its token."""
+        token = secrets.token_urlsafe(32)
+        session = SessionAccount(*(account[field] for field in SessionAccount._fields))
+        # Indexed first: storing the session may evict it at once, which removes it from the index again
+        with self._lock:
+            self.tokens_by_user.setdefault(session.username, set()).add(token)
+        self.cache.set(token, session)
+        return token
+
+    def get(self, token):
+        """Return the SessionAccount of a live session, or None."""
+        return self.cache.get(token) if token else None
+
+    def invalidate(self, token):
+        """End one session."""
+        return self.cache.pop(token) is not None
+
+    def invalidate_user(self, username):
+        """End every session of a user, for example after their PIN changed."""
+        with self._lock:
+            tokens = list(self.tokens_by_user.get(username, ()))
+        # Popping calls _forget, which takes the lock again
+        return sum(self.cache.pop(token) is not None for token in tokens)
+
+    def stats(self):
+        """Return the usage counters of the store."""
+        stats = self.cache.stats.as_dict()
+        stats.update(entries=len(self.cache), bytes=self.cache.bytes)
+        return stats
@@ -0,0 +1,43 @@
+# Description: Coordinated shutdown within a deadline.
+# Steps are registered in the order they must run (drain background work, flush writes, checkpoint
+# and close the database, tear down the GUI) and each receives the time left before the deadline.
+# A failing or slow step is reported and the remaining steps still run, so the database is always
+# closed cleanly and the next start does not have to recover the WAL.
+
+import threading
+import time
+
+import config
+
+
+class ShutdownManager:
+    """Run registered shutdown steps once, in order, within a shared deadline."""
+
+    def __init__(self, deadline=None):
+        self.deadline = config.SHUTDOWN_DEADLINE if deadline is None else deadline
+        self.steps = []  # (name, function taking the seconds left)
+        self.started = False
+        self._lock = threading.Lock()
+
+    def add_step(self, name, func):
+        """Register a step; func is called with the number of seconds left before the deadline."""
+        self.steps.append((name, func))
+
+    def shutdown(self):
+        """Run every step. Return False if this was not the first call or a step failed or overran."""
+        with self._lock:
+            if self.started:
+                return False
+            self.started = True
+        clean = True
+        ends_at = time.monotonic() + self.deadline
+        for name, func in self.steps:
+            remaining = max(0.0, ends_at - time.monotonic())
+            try:
+                if func(remaining) is False:
+                    print(f"Error: shutdown step '{name}' did not finish within the deadline")
+                    clean = False
+            except Exception as e:
+                print(f"Error: shutdown step '{name}' failed - {str(e)}")
+                clean = False
+        return clean
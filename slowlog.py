@@ -0,0 +1,99 @@
+# Description: Opt-in log of slow SQL statements with their query plans.
+# When ACCOUNTS_SLOW_QUERY_MS is set, every statement slower than that many milliseconds is written
+# to a rotating log file with its elapsed time, its parameters (PINs and security answers redacted)
+# and SQLite's EXPLAIN QUERY PLAN output, so a full scan of the accounts table shows up as
+# "SCAN accounts" next to the statement that caused it.
+
+import re
+import sqlite3
+
+import config
+
+# Columns whose values must never reach the log
+SENSITIVE_COLUMNS = {"pin", "security_answer"}
+
+REDACTED = "<redacted>"
+
+_threshold = config.SLOW_QUERY_MS / 1000 if config.SLOW_QUERY_MS > 0 else None
+_logger = None
+
+_ASSIGNMENT = re.compile(r"(\w+)\s*(?:=|==|<>|!=|<=|>=|<|>|\bLIKE|\bIS)\s*$", re.IGNORECASE)
+_INSERT_COLUMNS = re.compile(r"INSERT\s+(?:OR\s+\w+\s+)?INTO\s+\w+\s*\(([^)]*)\)", re.IGNORECASE)
+
+
+def enable(threshold_ms):
+    """Log statements slower than threshold_ms; None or 0 turns the log off."""
+    global _threshold
+    _threshold = threshold_ms / 1000 if threshold_ms else None
+
+
+def is_enabled():
+    """Return True if slow statements are being logged."""
+    return _threshold is not None
+
+
+def get_logger():
+    """Return the slow-query logger, attaching its rotating file handler on first use."""
+    global _logger
+    if _logger is None:
+        # Imported here: logging costs startup time and is only needed once something is slow
+        import logging
+        from logging.handlers import RotatingFileHandler
+
+        logger = logging.getLogger("accounts.slow_query")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        handler = RotatingFileHandler(config.SLOW_QUERY_LOG, maxBytes=config.SLOW_QUERY_LOG_MAX_BYTES,
+                                      backupCount=config.SLOW_QUERY_LOG_BACKUPS)
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        logger.addHandler(handler)
+        _logger = logger
+    return _logger
+
+
+def placeholder_columns(sql):
+    """Return the column each positional placeholder of a statement is bound to, or None where unknown."""
+    insert = _INSERT_COLUMNS.search(sql)
+    if insert:
+        return [column.strip().lower() for column in insert.group(1).split(",")]
+    columns = []
+    for match in re.finditer(r"\?", sql):
+        assignment = _ASSIGNMENT.search(sql, 0, match.start())
+        columns.append(assignment.group(1).lower() if assignment else None)
+    return columns
+
+
+def redact(sql, parameters):
+    """Return the parameters with values bound to sensitive columns replaced."""
+    if isinstance(parameters, dict):
+        return {name: REDACTED if name.lower() in SENSITIVE_COLUMNS else value for name, value in parameters.items()}
+    columns = placeholder_columns(sql)
+    redacted = []
+    for index, value in enumerate(parameters):
+        column = columns[index] if index < len(columns) else None
+        # An unidentified placeholder may be a PIN or an answer, so only show values we can place
+        redacted.append(value if column is not None and column not in SENSITIVE_COLUMNS else REDACTED)
+    return redacted
+
+
+def query_plan(conn, sql, parameters):
+    """Return SQLite's EXPLAIN QUERY PLAN lines for a statement, or an empty list."""
+    if sql.split(None, 1)[0].lower() not in ("select", "insert", "update", "delete", "with"):
+        return []
+    try:
+        # Plain sqlite3 execute, so explaining a statement is not itself timed and logged
+        rows = sqlite3.Connection.execute(conn, f"EXPLAIN QUERY PLAN {sql}", parameters).fetchall()
+    except sqlite3.Error as e:
+        return [f"(no plan: {str(e)})"]
+    return [row[-1] for row in rows]
+
+
+def record(conn, sql, parameters, elapsed, count=1):
+    """Log a statement if it took longer than the threshold."""
+    if _threshold is None or elapsed < _threshold:
+        return
+    statement = " ".join(sql.split())
+    plan = query_plan(conn, sql, parameters)
+    batch = f" rows={count}" if count != 1 else ""
+    get_logger().info(f"elapsed_ms={elapsed * 1000:.2f}{batch} sql={statement!r} "
+                      f"params={redact(sql, parameters)!r} plan={plan!r}")
@@ -0,0 +1,79 @@
+# Description: Tests for the SQLite connection pool.
+
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from database import ConnectionPool, PoolTimeoutError
+
+
+class ConnectionPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.pool = ConnectionPool(path=os.path.join(self.directory.name, "accounts.db"), size=2, timeout=0.05)
+
+    def tearDown(self):
+        self.pool.close()
+        self.directory.cleanup()
+
+    def test_exhausted_pool_times_out(self):
+        first, second = self.pool.acquire(), self.pool.acquire()
+        with self.assertRaises(PoolTimeoutError):
+            self.pool.acquire()
+        self.assertEqual(self.pool.stats.timeouts, 1)
+
+        # A released connection is handed out again
+        self.pool.release(second)
+        self.assertIs(self.pool.acquire(), second)
+        self.pool.release(first)
+        self.pool.release(second)
+
+    def test_discarded_connection_frees_its_slot(self):
+        first, second = self.pool.acquire(), self.pool.acquire()
+        self.pool.discard(first)
+        replacement = self.pool.acquire()
+        self.assertIsNot(replacement, first)
+        self.pool.release(second)
+        self.pool.release(replacement)
+
+    def test_opening_a_connection_does_not_block_the_pool(self):
+        warm = self.pool.acquire()
+        opening, finish = threading.Event(), threading.Event()
+        create_connection = self.pool._create_connection
+
+        def slow_create_connection():
+            opening.set()
+            finish.wait(5)
+            return create_connection()
+
+        with mock.patch.object(self.pool, "_create_connection", slow_create_connection):
+            opener = threading.Thread(target=lambda: self.pool.release(self.pool.acquire()))
+            opener.start()
+            self.assertTrue(opening.wait(5))
+            # Returning and borrowing a warm connection does not wait for the slow open
+            borrowed = []
+            borrower = threading.Thread(target=lambda: (self.pool.release(warm), borrowed.append(self.pool.acquire())))
+            borrower.start()
+            borrower.join(1)
+            finished = not borrower.is_alive()
+            finish.set()
+            borrower.join(5)
+            self.assertTrue(finished)
+            self.assertEqual(borrowed, [warm])
+            opener.join(5)
+        self.pool.release(warm)
+
+    def test_failed_open_frees_its_slot(self):
+        with mock.patch.object(self.pool, "_create_connection", side_effect=sqlite3.OperationalError("locked")):
+            with self.assertRaises(sqlite3.OperationalError):
+                self.pool.acquire()
+        first, second = self.pool.acquire(), self.pool.acquire()
+        self.pool.release(first)
+        self.pool.release(second)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+# Description: Tests for PIN hashing, verification and rehash decisions.
+
+import unittest
+from unittest import mock
+
+import hashing
+
+SCRYPT_PARAMS = ("scrypt", hashing.MIN_SCRYPT_N)
+PBKDF2_PARAMS = ("pbkdf2_sha256", hashing.MIN_PBKDF2_ITERATIONS)
+
+
+@unittest.skipUnless(hasattr(hashing.hashlib, "scrypt"), "scrypt is not available")
+class VerifyPinTest(unittest.TestCase):
+    def test_every_format_verifies(self):
+        for stored in (hashing.legacy_hash_pin("1234"), hashing.hash_pin("1234", SCRYPT_PARAMS),
+                       hashing.hash_pin("1234", PBKDF2_PARAMS)):
+            with self.subTest(stored=stored.split("$")[0]):
+                self.assertTrue(hashing.verify_pin("1234", stored))
+                self.assertFalse(hashing.verify_pin("4321", stored))
+
+    def test_salts_differ(self):
+        self.assertNotEqual(hashing.hash_pin("1234", SCRYPT_PARAMS), hashing.hash_pin("1234", SCRYPT_PARAMS))
+
+    def test_malformed_hashes_do_not_verify(self):
+        for stored in ("scrypt$notanumber$8$1$00$00", "pbkdf2_sha256$1000$zz$00", "md5$abc$def"):
+            with self.subTest(stored=stored):
+                self.assertFalse(hashing.verify_pin("1234", stored))
+
+    def test_needs_rehash(self):
+        with mock.patch.object(hashing, "_kdf_params", ("scrypt", hashing.MIN_SCRYPT_N * 2)):
+            self.assertTrue(hashing.needs_rehash(hashing.legacy_hash_pin("1234")))
+            self.assertTrue(hashing.needs_rehash(hashing.hash_pin("1234", SCRYPT_PARAMS)))
+            self.assertTrue(hashing.needs_rehash(hashing.hash_pin("1234", PBKDF2_PARAMS)))
+            self.assertFalse(hashing.needs_rehash(hashing.hash_pin("1234")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+# Description: Tests for the versioned schema migrations.
+
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+import migrations
+
+LEGACY_SCHEMA = '''CREATE TABLE accounts
+                   (first_name TEXT, last_name TEXT, address_line1 TEXT, address_line2 TEXT,
+                    account_type TEXT, username TEXT, pin TEXT, security_question TEXT, security_answer TEXT)'''
+
+
+def account(username, first_name="Ann"):
+    return (first_name, "Lee", "1 Main St", "", "User", username, "pin", "What city were you born in?", "Paris")
+
+
+class AddPrimaryKeyTest(unittest.TestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        self.conn = sqlite3.connect(self.path, isolation_level=None)
+        self.conn.execute(LEGACY_SCHEMA)
+        self.insert(account("alice", "Oldest"), account("bob"), account("alice", "Newer"), account("carol"),
+                    account("bob", "Newer"), account("dave"))
+
+    def tearDown(self):
+        self.conn.close()
+        os.remove(self.path)
+
+    def insert(self, *rows):
+        placeholders = ", ".join("?" * len(migrations.ACCOUNT_COLUMNS))
+        self.conn.executemany(f"INSERT INTO accounts ({', '.join(migrations.ACCOUNT_COLUMNS)}) "
+                              f"VALUES ({placeholders})", rows)
+
+    def usernames(self, table):
+        return self.conn.execute(f"SELECT id, username, first_name FROM {table} ORDER BY id").fetchall()
+
+    def test_keeps_oldest_row_and_sets_duplicates_aside(self):
+        with mock.patch("builtins.print"):
+            self.assertEqual(migrations.migrate(self.conn), migrations.LATEST_VERSION)
+        self.assertEqual(self.usernames("accounts"),
+                         [(1, "alice", "Oldest"), (2, "bob", "Ann"), (4, "carol", "Ann"), (6, "dave", "Ann")])
+        self.assertEqual(self.usernames("accounts_duplicates"), [(3, "alice", "Newer"), (5, "bob", "Newer")])
+
+    def test_drops_side_table_without_duplicates(self):
+        self.conn.execute("DELETE FROM accounts WHERE first_name='Newer'")
+        migrations.migrate(self.conn)
+        tables = {row[0] for row in self.conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+        self.assertNotIn("accounts_duplicates", tables)
+
+    def test_resumes_after_interrupted_swap(self):
+        def deny_drop(action, *_args):
+            return sqlite3.SQLITE_DENY if action == sqlite3.SQLITE_DROP_TABLE else sqlite3.SQLITE_OK
+
+        # Copy in batches of two, then fail at the swap
+        self.conn.set_authorizer(deny_drop)
+        with mock.patch.object(migrations, "COPY_BATCH_SIZE", 2), self.assertRaises(sqlite3.DatabaseError):
+            migrations.migrate(self.conn)
+        self.conn.set_authorizer(None)
+        self.assertEqual(migrations.get_version(self.conn), 0)
+
+        # Changes made between the two runs must survive the migration
+        self.insert(account("erin"), account("carol", "Newer"))
+        self.conn.execute("UPDATE accounts SET first_name='Renamed' WHERE username='dave'")
+        with mock.patch("builtins.print"):
+            migrations.migrate(self.conn)
+
+        self.assertEqual(self.usernames("accounts"), [(1, "alice", "Oldest"), (2, "bob", "Ann"), (4, "carol", "Ann"),
+                                                      (6, "dave", "Renamed"), (7, "erin", "Ann")])
+        self.assertEqual(self.usernames("accounts_duplicates"),
+                         [(3, "alice", "Newer"), (5, "bob", "Newer"), (8, "carol", "Newer")])
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.insert(account("alice"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,33 @@
+# Description: Tests for parameter redaction in the slow-query log.
+
+import unittest
+
+import queries
+from slowlog import REDACTED, redact
+
+
+class RedactTest(unittest.TestCase):
+    def test_insert_hides_pin_and_answer(self):
+        values = ("Ann", "Lee", "1 Main St", "", "User", "ann", "1234", "What city were you born in?", "Paris")
+        redacted = redact(queries.QUERIES["insert_account"], values)
+        self.assertEqual(redacted[5], "ann")
+        self.assertEqual(redacted[6], REDACTED)
+        self.assertEqual(redacted[8], REDACTED)
+        self.assertNotIn("1234", redacted)
+        self.assertNotIn("Paris", redacted)
+
+    def test_where_clause_hides_pin(self):
+        self.assertEqual(redact(queries.QUERIES["upgrade_pin"], ("new-hash", "ann", "old-hash")),
+                         [REDACTED, "ann", REDACTED])
+
+    def test_named_parameters(self):
+        self.assertEqual(redact("UPDATE accounts SET pin=:pin WHERE username=:username",
+                                {"pin": "1234", "username": "ann"}),
+                         {"pin": REDACTED, "username": "ann"})
+
+    def test_unidentified_placeholder_is_hidden(self):
+        self.assertEqual(redact("SELECT 1 FROM accounts WHERE lower(?) = username", ("1234",)), [REDACTED])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+# Description: Tests for the brute-force rate limiter.
+
+import unittest
+from unittest import mock
+
+from throttle import RateLimiter
+
+
+class RateLimiterTest(unittest.TestCase):
+    def setUp(self):
+        # Three attempts per user, refilled at one a minute; ten per source
+        self.limiter = RateLimiter(scopes={"user": (3, 1 / 60), "source": (10, 1 / 60)}, lockout_seconds=300,
+                                   max_keys=100)
+        self.now = 1000.0
+        patcher = mock.patch("throttle.time.time", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def attempt(self, user="ann", source="10.0.0.1"):
+        return self.limiter.check("login", user=user, source=source)
+
+    def test_locks_out_once_the_bucket_is_empty(self):
+        self.assertEqual([self.attempt() for _ in range(3)], [0, 0, 0])
+        self.assertEqual(self.attempt(), 300)
+        self.assertEqual(self.limiter.stats.lockouts, 1)
+        self.now += 100
+        self.assertEqual(self.attempt(), 200)
+
+    def test_refills_over_time(self):
+        for _ in range(3):
+            self.attempt()
+        self.now += 60
+        self.assertEqual(self.attempt(), 0)
+        self.assertGreater(self.attempt(), 0)
+
+    def test_lockout_expires(self):
+        for _ in range(4):
+            self.attempt()
+        self.now += 300
+        self.assertEqual(self.attempt(), 0)
+
+    def test_rejected_attempt_does_not_drain_other_buckets(self):
+        for user in ("a", "b", "c", "d", "e", "f", "g", "h", "i", "j"):
+            self.assertEqual(self.attempt(user=user), 0)
+        self.assertGreater(self.attempt(user="victim"), 0)
+        # The source lockout left the victim's own bucket full
+        self.assertEqual([self.attempt(user="victim", source="10.0.0.2") for _ in range(3)], [0, 0, 0])
+
+    def test_success_refunds_the_source(self):
+        for user in ("a", "b", "c", "d", "e", "f", "g", "h", "i"):
+            self.attempt(user=user)
+        for _ in range(5):
+            self.assertEqual(self.attempt(user="good"), 0)
+            self.limiter.forgive("login", "user", "good")
+            self.limiter.refund("login", "source", "10.0.0.1")
+
+    def test_unconfigured_scopes_are_not_limited(self):
+        limiter = RateLimiter(scopes={"user": (1, 0)}, lockout_seconds=300, max_keys=100)
+        self.assertEqual([limiter.check("login", user=f"u{i}", source="local") for i in range(5)], [0] * 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
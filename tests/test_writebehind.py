@@ -0,0 +1,48 @@
+# Description: Tests for the write-behind queue.
+
+import os
+import sqlite3
+import tempfile
+import unittest
+
+import database
+from writebehind import WriteBehindQueue
+
+
+def account(username):
+    return ("Ann", "Lee", "1 Main St", "", "User", username, "hash", "What city were you born in?", "Paris")
+
+
+class WriteBehindQueueTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        database.configure_pool(path=os.path.join(self.directory.name, "accounts.db"))
+        database.setup_db()
+        # A long flush interval puts every write of a test in the same batch
+        self.queue = WriteBehindQueue(flush_interval=200, max_batch=10)
+
+    def tearDown(self):
+        self.queue.close(5)
+        database.close_pool()
+        self.directory.cleanup()
+
+    def test_failed_write_does_not_roll_back_the_batch(self):
+        futures = [self.queue.submit("insert_account", account(name)) for name in ("ann", "ann", "bob")]
+        self.assertEqual(futures[0].result(5), 1)
+        with self.assertRaises(sqlite3.IntegrityError):
+            futures[1].result(5)
+        self.assertEqual(futures[2].result(5), 1)
+        self.assertEqual(self.queue.batches, 1)
+        with database.connect_db() as conn:
+            usernames = [row[0] for row in conn.execute("SELECT username FROM accounts ORDER BY id")]
+        self.assertEqual(usernames, ["ann", "bob"])
+
+    def test_submit_after_close_fails(self):
+        self.queue.execute("insert_account", account("ann"))
+        self.assertTrue(self.queue.close(5))
+        with self.assertRaises(sqlite3.ProgrammingError):
+            self.queue.submit("insert_account", account("bob"))
+
+
+if __name__ == "__main__":
+    unittest.main()
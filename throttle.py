@@ -0,0 +1,183 @@
+# Description: Brute-force throttling for login and security-answer attempts.
+# An attempt is let through only if both its per-username and its per-source bucket have a token, and
+# only then is a token taken from each; a successful attempt gives them back. An empty bucket locks the
+# key out for a while, and the attempt is rejected before any hashing or SQL happens, so attack
+# traffic never reaches the database. Buckets live in one bounded in-memory map and are saved to a
+# file periodically so a restart does not hand an attacker a fresh set of tries.
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import config
+
+# Attempts made from the desktop GUI have no network source and are only limited per username
+LOCAL_SOURCE = "local"
+
+
+class ThrottleStats:
+    """Counters describing throttling decisions."""
+
+    def __init__(self):
+        self.allowed = 0
+        self.rejected = 0
+        self.lockouts = 0
+        self.rejected_by_scope = {}
+
+    def as_dict(self):
+        """Return the counters as a dictionary."""
+        stats = dict(vars(self))
+        stats["rejected_by_scope"] = dict(self.rejected_by_scope)
+        return stats
+
+    def render(self):
+        """Return the counters in the Prometheus text exposition format."""
+        lines = ["# HELP throttle_allowed_total Attempts let through by the rate limiter.",
+                 "# TYPE throttle_allowed_total counter",
+                 f"throttle_allowed_total {self.allowed}",
+                 "# HELP throttle_rejected_total Attempts rejected by the rate limiter, by the scope that ran out.",
+                 "# TYPE throttle_rejected_total counter"]
+        lines.extend(f'throttle_rejected_total{{scope="{scope}"}} {count}'
+                     for scope, count in sorted(self.rejected_by_scope.items()))
+        lines.extend(["# HELP throttle_lockouts_total Keys locked out after exhausting their budget.",
+                      "# TYPE throttle_lockouts_total counter",
+                      f"throttle_lockouts_total {self.lockouts}"])
+        return "\n".join(lines) + "\n"
+
+
+class RateLimiter:
+    """Token buckets keyed by strings, with lockout once a bucket runs dry.
+
+    Each bucket is stored as a (tokens, updated_at, locked_until) tuple. scopes maps a scope name
+    to its (capacity, refill per second) pair; keys are "<action>:<scope>:<value>".
+    """
+
+    def __init__(self, scopes, lockout_seconds, max_keys, path=None):
+        self.scopes = scopes
+        self.lockout_seconds = lockout_seconds
+        self.max_keys = max_keys
+        self.path = path
+        self.stats = ThrottleStats()
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._persister = None
+
+    def _refill(self, scope, key, now):
+        """Return the (tokens, locked until) of a bucket as of now."""
+        capacity, refill_rate = self.scopes[scope]
+        tokens, updated_at, locked_until = self._buckets.get(key, (capacity, now, 0.0))
+        if locked_until > now:
+            return tokens, locked_until
+        return min(capacity, tokens + (now - updated_at) * refill_rate), 0.0
+
+    def _store(self, key, bucket):
+        self._buckets[key] = bucket
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+
+    def check(self, action, **values):
+        """Record an attempt for every scope given as scope=value.
+
+        Return 0 if the attempt may go ahead, otherwise the number of seconds until it may be retried.
+        Tokens are only taken when every bucket allows the attempt, so a rejected attempt does not
+        drain the others. Scopes without a configured bucket are not limited.
+        """
+        now = time.time()
+        with self._lock:
+            buckets = []
+            for scope, value in values.items():
+                if scope not in self.scopes:
+                    continue
+                key = f"{action}:{scope}:{value}"
+                tokens, locked_until = self._refill(scope, key, now)
+                if not locked_until and tokens < 1:
+                    locked_until = now + self.lockout_seconds
+                    self._store(key, (tokens, now, locked_until))
+                    self.stats.lockouts += 1
+                if locked_until:
+                    self.stats.rejected += 1
+                    self.stats.rejected_by_scope[scope] = self.stats.rejected_by_scope.get(scope, 0) + 1
+                    return locked_until - now
+                buckets.append((key, tokens))
+            for key, tokens in buckets:
+                self._store(key, (tokens - 1, now, 0.0))
+            self.stats.allowed += 1
+            return 0
+
+    def forgive(self, action, scope, value):
+        """Refill a bucket after a successful attempt, so legitimate users are not locked out."""
+        with self._lock:
+            self._buckets.pop(f"{action}:{scope}:{value}", None)
+
+    def refund(self, action, scope, value):
+        """Give back the token a successful attempt took, leaving earlier failures counted."""
+        key = f"{action}:{scope}:{value}"
+        now = time.time()
+        with self._lock:
+            if key in self._buckets:
+                tokens, locked_until = self._refill(scope, key, now)
+                if not locked_until:
+                    self._store(key, (min(self.scopes[scope][0], tokens + 1), now, 0.0))
+
+    def save(self):
+        """Write the buckets to the persistence file atomically."""
+        if not self.path:
+            return
+        with self._lock:
+            state = [[key, *bucket] for key, bucket in self._buckets.items()]
+        temp_path = f"{self.path}.tmp"
+        try:
+            with open(temp_path, "w") as file:
+                json.dump(state, file)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            print(f"Error: could not save throttle state - {str(e)}")
+
+    def load(self):
+        """Restore the buckets from the persistence file, if there is one."""
+        if not self.path:
+            return
+        try:
+            with open(self.path) as file:
+                state = json.load(file)
+        except (OSError, ValueError):
+            return
+        with self._lock:
+            for key, tokens, updated_at, locked_until in state:
+                self._buckets[key] = (tokens, updated_at, locked_until)
+
+    def start_persistence(self, interval=None):
+        """Save the buckets in the background every interval seconds."""
+        interval = config.THROTTLE_PERSIST_INTERVAL if interval is None else interval
+        if not self.path or interval <= 0 or self._persister is not None:
+            return
+
+        def run():
+            while not self._stop_event.wait(interval):
+                self.save()
+
+        self._persister = threading.Thread(target=run, name="throttle-persister", daemon=True)
+        self._persister.start()
+
+    def stop_persistence(self):
+        """Stop the background saver and save one last time."""
+        self._stop_event.set()
+        self._persister = None
+        self.save()
+
+
+def default_limiter():
+    """Build the limiter for login and security-answer attempts from the configured settings."""
+    return RateLimiter(
+        scopes={
+            "user": (config.THROTTLE_USER_CAPACITY, config.THROTTLE_USER_REFILL_PER_MINUTE / 60),
+            "source": (config.THROTTLE_SOURCE_CAPACITY, config.THROTTLE_SOURCE_REFILL_PER_MINUTE / 60),
+        },
+        lockout_seconds=config.THROTTLE_LOCKOUT_SECONDS,
+        max_keys=config.THROTTLE_MAX_KEYS,
+        path=config.THROTTLE_STATE_PATH,
+    )
@@ -0,0 +1,98 @@
+# Description: Background execution for the Tkinter GUI.
+# Database queries and PIN hashing run on a shared thread pool so a slow disk or a locked
+# database never freezes the event loop. Results are handed back to the Tk thread by polling
+# the pending future with after(), because Tk widgets may only be touched from that thread.
+
+import threading
+import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import config
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# Futures submitted by run_in_background that have not finished yet
+_pending = set()
+
+
+def get_executor():
+    """Return the shared worker pool, creating it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=config.WORKER_THREADS, thread_name_prefix="worker")
+        return _executor
+
+
+def shutdown_workers(wait=True):
+    """Stop the shared worker pool."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait, cancel_futures=not wait)
+
+
+def drain_workers(timeout=None):
+    """Wait up to timeout seconds for running tasks, then stop the pool. Return True if all finished.
+
+    Queued tasks that have not started are cancelled. Running ones cannot be stopped, and the
+    interpreter joins their threads at exit; see running_tasks().
+    """
+    _done, not_done = wait(list(_pending), timeout)
+    shutdown_workers(wait=not not_done)
+    return not not_done
+
+
+def running_tasks():
+    """Return the number of tasks submitted by run_in_background that are still running."""
+    return sum(not future.done() for future in list(_pending))
+
+
+def set_busy(widgets, busy, busy_text="Please wait..."):
+    """Disable buttons and show a loading label, or restore them."""
+    for widget in widgets:
+        try:
+            if busy:
+                widget.original_text = widget.cget("text")
+                widget.config(state="disabled", text=busy_text)
+            else:
+                widget.config(state="normal", text=getattr(widget, "original_text", widget.cget("text")))
+        except Exception:
+            pass  # the widget was destroyed while the task was running
+
+
+def run_in_background(widget, func, args=(), on_success=None, on_error=None, busy=()):
+    """Run func(*args) on the worker pool and deliver the result on the Tk thread.
+
+    widget is any live Tk widget used to schedule the polling. The widgets in busy are
+    disabled until the task finishes. on_success receives the return value and on_error
+    receives the exception; both are called from the Tk event loop.
+    """
+    future = get_executor().submit(func, *args)
+    _pending.add(future)
+    future.add_done_callback(_pending.discard)
+    set_busy(busy, True)
+
+    def poll():
+        if not future.done():
+            try:
+                widget.after(config.WORKER_POLL_INTERVAL, poll)
+            except tk.TclError:
+                pass  # the widget was destroyed; nobody is waiting for the result
+            return
+        set_busy(busy, False)
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            if on_error is not None:
+                on_error(error)
+            else:
+                print(f"Error: {str(error)}")
+        elif on_success is not None:
+            on_success(future.result())
+
+    widget.after(config.WORKER_POLL_INTERVAL, poll)
+    return future
@@ -0,0 +1,133 @@
+# Description: Optional write-behind queue that groups account writes into shared transactions.
+# Each commit of a PIN reset or signup costs an fsync, so a burst of them (a forced PIN rotation, say)
+# is limited by the disk rather than the CPU. Writes submitted here are collected for up to a flush
+# interval or a maximum batch size and committed together; each caller gets a future that resolves
+# once its write is durable, or fails with that write's own error.
+
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+import config
+import queries
+from database import connect_db
+
+
+class WriteQueueFullError(sqlite3.OperationalError):
+    """Raised when the write queue stays full for longer than the submit timeout."""
+
+
+class WriteBehindQueue:
+    """Bounded queue of named-query writes flushed in batches by a background thread."""
+
+    def __init__(self, connect=connect_db, max_size=None, flush_interval=None, max_batch=None, submit_timeout=None,
+                 commit_timeout=None):
+        self.connect = connect
+        self.flush_interval = (config.WRITE_FLUSH_INTERVAL_MS if flush_interval is None else flush_interval) / 1000
+        self.max_batch = max_batch or config.WRITE_MAX_BATCH
+        self.submit_timeout = config.WRITE_SUBMIT_TIMEOUT if submit_timeout is None else submit_timeout
+        self.commit_timeout = config.WRITE_COMMIT_TIMEOUT if commit_timeout is None else commit_timeout
+        self.batches = 0
+        self.writes = 0
+        self._queue = queue.Queue(max_size or config.WRITE_QUEUE_SIZE)
+        self._thread = None
+        self._closed = False
+        self._lock = threading.Lock()
+        # Notified when the writer takes items off the queue, or when the queue closes
+        self._not_full = threading.Condition(self._lock)
+
+    def submit(self, name, parameters):
+        """Queue a registered write query and return a future resolving to its rowcount once committed."""
+        future = Future()
+        deadline = time.monotonic() + self.submit_timeout
+        # Checking for close and enqueueing under one lock keeps a write from landing behind the stop
+        # marker; waiting for room releases the lock, so other callers and close() are never held up
+        with self._not_full:
+            while True:
+                if self._closed:
+                    raise sqlite3.ProgrammingError("Write queue is closed.")
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+                    self._thread.start()
+                try:
+                    self._queue.put_nowait((name, parameters, future))
+                    return future
+                except queue.Full:
+                    pass
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise WriteQueueFullError("Too many pending writes. Try again later.")
+                self._not_full.wait(remaining)
+
+    def execute(self, name, parameters):
+        """Queue a write and wait until it is committed; return its rowcount or raise its error."""
+        try:
+            return self.submit(name, parameters).result(self.commit_timeout)
+        except FutureTimeoutError:
+            raise sqlite3.OperationalError("Timed out waiting for the write to be committed.") from None
+
+    def close(self, timeout=None):
+        """Commit pending writes and stop the background thread. Return False on timeout."""
+        with self._not_full:
+            self._closed = True
+            thread = self._thread
+            self._not_full.notify_all()
+        if thread is None:
+            return True
+        # No write can be queued once _closed is set, so the marker is the last item
+        self._queue.put(None)
+        thread.join(timeout)
+        return not thread.is_alive()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            with self._not_full:
+                self._not_full.notify_all()
+            self._write(batch)
+            if stop:
+                return
+
+    def _write(self, batch):
+        """Commit a batch in one transaction, isolating each write in a savepoint."""
+        results = []
+        try:
+            with self.connect() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                for name, parameters, future in batch:
+                    conn.execute("SAVEPOINT write")
+                    try:
+                        results.append((future, queries.execute(conn, name, parameters).rowcount, None))
+                    except sqlite3.Error as e:
+                        conn.execute("ROLLBACK TO write")
+                        results.append((future, None, e))
+                    conn.execute("RELEASE write")
+        except Exception as e:
+            # Nothing in the batch was committed
+            for _name, _parameters, future in batch:
+                future.set_exception(e)
+        else:
+            self.batches += 1
+            self.writes += len(batch)
+            for future, rowcount, error in results:
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(rowcount)